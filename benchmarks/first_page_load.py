@@ -0,0 +1,87 @@
+"""
+Benchmarks the requests of the initial page load: the time to first byte and the payload size (as transferred, with gzip if the server supports it)
+of the index page, the layout and the static assets it references, for a first visit and for a repeated visit (which may revalidate its cache).
+
+Measure it in this process (via the Flask test client):
+
+    python benchmarks/first_page_load.py
+
+Or against a running server, e.g one started with gunicorn main:server:
+
+    python benchmarks/first_page_load.py --url http://127.0.0.1:8000
+"""
+import argparse
+import gzip
+import os
+import re
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPETITIONS = 20
+
+# The headers of a browser, so that the responses are compressed and conditional requests can be answered with 304 Not Modified
+HEADERS = {"Accept-Encoding": "gzip, deflate"}
+
+def decompress(body, headers):
+    if headers.get("Content-Encoding") == "gzip":
+        return gzip.decompress(body)
+    return body
+
+def test_client_get():
+    import main
+    client = main.server.test_client()
+    def get(path, headers):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        body = response.get_data()
+        return time.perf_counter() - start, response.status_code, response.headers, body
+    return get
+
+def url_get(url):
+    session = requests.Session()
+    def get(path, headers):
+        start = time.perf_counter()
+        # With stream=True the request returns as soon as the headers are there, which is the time to first byte
+        response = session.get(f"{url}{path}", headers=headers, stream=True)
+        ttfb = time.perf_counter() - start
+        # The raw stream still contains the (compressed) body as it was transferred
+        body = response.raw.read(decode_content=False)
+        return ttfb, response.status_code, response.headers, body
+    return get
+
+def find_assets(layout):
+    # URLs of the static assets referenced by the layout (e.g the geojson of the world map), dash escapes the slashes inside of the JSON
+    return sorted(set(re.findall(r'"(/[^"]*\.(?:json|css))"', layout.replace("\\u002f", "/"))))
+
+def measure(get, path, headers):
+    durations = []
+    for _ in range(REPETITIONS):
+        duration, status, response_headers, body = get(path, headers)
+        durations.append(duration)
+    return statistics.median(durations), status, len(body), len(decompress(body, response_headers)), response_headers.get("Cache-Control", "-")
+
+def run(get):
+    _, _, layout_headers, layout = get("/_dash-layout", HEADERS)
+    paths = ["/", "/_dash-layout", *find_assets(decompress(layout, layout_headers).decode("utf-8"))]
+
+    print(f"{'Request':<55} {'Visit':<7} {'Status':>6} {'TTFB':>9} {'Transferred':>12} {'Decoded':>10}  Cache-Control")
+    for path in paths:
+        _, _, first_headers, _ = get(path, HEADERS)
+        revalidation = dict(HEADERS)
+        if first_headers.get("ETag") != None:
+            revalidation["If-None-Match"] = first_headers["ETag"]
+        for (visit, headers) in (("first", HEADERS), ("repeat", revalidation)):
+            ttfb, status, size, decoded_size, cache_control = measure(get, path, headers)
+            print(f"{path[:55]:<55} {visit:<7} {status:>6} {ttfb * 1000:>7.1f}ms {size / 1024:>10.1f}KB {decoded_size / 1024:>8.1f}KB  {cache_control}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the requests of the initial page load.")
+    parser.add_argument("--url", default=None, help="URL of a running server (default: measure in this process via the Flask test client)")
+    args = parser.parse_args()
+
+    run(test_client_get() if args.url == None else url_get(args.url))
@@ -0,0 +1,131 @@
+"""
+Load harness for the dashboard callbacks.
+
+Check that the callbacks return the same responses when they are called concurrently (in this process, via the Flask test client):
+
+    python benchmarks/load_test.py --check-thread-safety
+
+Measure throughput and latency against a running server, e.g one started with WEB_PROFILE=gthread gunicorn main:server:
+
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 8 --requests 400
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def callback_payload(outputs, inputs):
+    """
+    Builds the body of a _dash-update-component request in the same way the dash renderer does, inputs are (id, value) or (id, value, property)
+    """
+    inputs = [(input_id, value, *(rest or ["value"])) for (input_id, value, *rest) in inputs]
+    return {
+            "output": "..{}..".format("...".join(outputs)),
+            "outputs": [{"id": output.split(".")[0], "property": output.split(".")[1]} for output in outputs],
+            "inputs": [{"id": input_id, "property": input_property, "value": value} for (input_id, value, input_property) in inputs],
+            "changedPropIds": [f"{inputs[0][0]}.{inputs[0][2]}"]
+            }
+
+# A mix of the callbacks a page load triggers (the background callbacks are polled until they are done)
+PAYLOADS = [
+        ("country_detail", False, callback_payload(["country_detail_overlay.children", "country_detail_overlay.style", "country_detail_title.children", "country_detail_container.children"], [("selected_country", "Switzerland"), ("year", "2020")])),
+        ("similar_countries", False, callback_payload(["similar_countries_overlay.children", "similar_countries_overlay.style", "similar_countries_title.children", "similar_countries_container.children"], [("selected_country", "Switzerland"), ("year", "2020")])),
+        ("top_5_countries", False, callback_payload(["top_5_countries_title.children", "top_5_countries_overlay.children", "top_5_countries_overlay.style", "top_5_countries_bar_chart.figure"], [("year", "2020"), ("top_5_countries_feature", "Life Ladder")])),
+        ("biggest_movers", False, callback_payload(["biggest_movers_title.children", "biggest_movers_overlay.children", "biggest_movers_overlay.style", "biggest_movers_bar_chart.figure"], [("year", "2020"), ("biggest_movers_feature", "Life Ladder")])),
+        ("simplified_explanation", False, callback_payload(["simplified_explanation_overlay.children", "simplified_explanation_overlay.style", "simplified_explanation_container.children"], [("selected_country", "Switzerland"), ("first_feature", "Life Ladder"), ("second_feature", "Generosity")])),
+        ("heatmap", False, callback_payload(["heatmap_overlay.children", "heatmap_overlay.style", "correlation_overview_title.children", "heatmap.figure"], [("selected_country", "Switzerland")])),
+        ("global_analytics", False, callback_payload(["global_analytics_overlay.children", "global_analytics_overlay.style", "global_analytics_title.children", "global_correlation_heatmap.figure", "global_regression_bar_chart.figure", "rolling_correlation.figure"], [("year", "2020"), ("global_analytics_window", 3)])),
+        ("comparison", False, callback_payload(["comparison_overlay.children", "comparison_overlay.style", "comparison_title.children", "comparison_trajectory.figure", "comparison_ranks.figure"], [("comparison_countries", ["Switzerland", "Germany", "Finland"]), ("comparison_years", [2005, 2022]), ("comparison_feature", "Life Ladder")])),
+        ("scatter_plot", True, callback_payload(["scatter_plot_overlay.children", "scatter_plot_overlay.style", "features_title.children", "scatter_plot.figure"], [("selected_country", "Switzerland"), ("first_feature", "Life Ladder"), ("second_feature", "Generosity")])),
+        ("parallel_coordinate_system", True, callback_payload(["parallel_coordinate_system_title.children", "parallel_coordinate_system_overlay.children", "parallel_coordinate_system_overlay.style", "parallel_coordinate_system.figure", "parallel_coordinate_system_info.children"], [("year", "2020"), ("parallel_coordinate_system_features", ["Life Ladder", "Log GDP", "Social Support", "Generosity"]), ("parallel_coordinate_system_constraints", {}, "data")]))
+        ]
+
+def call(post, payload, is_background):
+    """
+    Calls a callback and returns the response body. Background callbacks are polled until their result is there.
+    """
+    body = post("/_dash-update-component", payload)
+    if not is_background:
+        return body
+
+    # The first response only contains the cache key and the job, the following ones the result once it is there
+    path = f"/_dash-update-component?cacheKey={body['cacheKey']}&job={body['job']}"
+    data = body
+    while "response" not in data:
+        time.sleep(0.05)
+        data = post(path, payload)
+    return data
+
+def check_thread_safety(concurrency, repetitions):
+    import main
+    from callback_manager import prepare_callback_manager
+
+    # Every thread gets its own test client, they all share the dataset, the index and the caches of the app
+    local = threading.local()
+    def post(path, payload):
+        if not hasattr(local, "client"):
+            local.client = main.server.test_client()
+        return local.client.post(path, json=payload).get_json()
+
+    # Both runs start from empty caches (the background callback results on disk and the figures cached in memory), otherwise the
+    # concurrent run would only look up what the serial run computed and never compute anything at the same time
+    def clear_caches(cache_directory):
+        main.app._background_manager = prepare_callback_manager(cache_directory, cache_by=[lambda: main.dataset_version], expire=main.CACHE_EXPIRE_SECONDS)
+        main.generate_global_analytics_figures.cache_clear()
+
+    with tempfile.TemporaryDirectory() as serial_cache_directory, tempfile.TemporaryDirectory() as concurrent_cache_directory:
+        clear_caches(serial_cache_directory)
+        expected = {name: call(post, payload, is_background) for (name, is_background, payload) in PAYLOADS}
+
+        clear_caches(concurrent_cache_directory)
+        work = [(name, payload, is_background) for (name, is_background, payload) in PAYLOADS] * repetitions
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda item: (item[0], call(post, item[1], item[2])), work))
+
+    mismatches = [name for (name, result) in results if result != expected[name]]
+    print(f"{len(results)} concurrent callback calls with {concurrency} threads, {len(mismatches)} responses differ from a serial run")
+    return len(mismatches) == 0
+
+def run_load_test(url, concurrency, number_of_requests):
+    session = requests.Session()
+    def post(path, payload):
+        return session.post(f"{url}{path}", json=payload).json()
+
+    work = [PAYLOADS[index % len(PAYLOADS)] for index in range(number_of_requests)]
+    def timed_call(item):
+        name, is_background, payload = item
+        start = time.perf_counter()
+        call(post, payload, is_background)
+        return name, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        durations = list(executor.map(timed_call, work))
+    total = time.perf_counter() - start
+
+    latencies = sorted(duration for (_, duration) in durations)
+    print(f"{number_of_requests} requests with concurrency {concurrency} in {total:.2f}s: {number_of_requests / total:.1f} requests/s")
+    print(f"Latency p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load harness for the dashboard callbacks.")
+    parser.add_argument("--url", default=None, help="URL of a running server to load test (e.g http://127.0.0.1:8000)")
+    parser.add_argument("--check-thread-safety", action="store_true", help="Call the callbacks concurrently in this process and compare the responses with a serial run")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400, help="Number of requests for the load test")
+    parser.add_argument("--repetitions", type=int, default=20, help="How often every callback is called for the thread safety check")
+    args = parser.parse_args()
+
+    if args.check_thread_safety:
+        if not check_thread_safety(args.concurrency, args.repetitions):
+            sys.exit(1)
+    if args.url != None:
+        run_load_test(args.url, args.concurrency, args.requests)
@@ -0,0 +1,46 @@
+"""
+Benchmarks the payload size and the time to build and serialize the parallel coordinate system at 1x, 10x and 100x the number of rows of a year.
+
+Run it from the root of the repository:
+
+    python benchmarks/parallel_coordinates.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+YEAR = 2020
+SCALES = [1, 10, 100]
+REPETITIONS = 5
+
+def scale_data(data, scale):
+    # Replicate the rows of the year and add a little bit of noise so that the lines do not overlap perfectly (like regional level data would)
+    rng = np.random.default_rng(0)
+    dff = pd.concat([data] * scale, ignore_index=True)
+    dff[main.FEATURES_IN_DATA] += rng.normal(0, 0.01, size=(len(dff.index), len(main.FEATURES_IN_DATA)))
+    return dff
+
+def measure(generate):
+    durations = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        payload = generate().to_json()
+        durations.append(time.perf_counter() - start)
+    return len(payload.encode("utf-8")), min(durations)
+
+if __name__ == "__main__":
+    data = main.df[main.df["year"] == YEAR]
+    dimensions = main.FEATURES_IN_DATA
+    print(f"{'Scale':>5} {'Rows':>7} {'Full (KB)':>10} {'Full (ms)':>10} {'Sampled (KB)':>13} {'Sampled (ms)':>13}")
+    for scale in SCALES:
+        dff = scale_data(data, scale)
+        full_bytes, full_duration = measure(lambda: px.parallel_coordinates(dff, color="life_ladder", dimensions=dimensions, color_continuous_scale=px.colors.sequential.Blues, labels=main.FEATURES_LABELS))
+        sampled_bytes, sampled_duration = measure(lambda: main.generate_parallel_coordinates(dff, dimensions, {})[0])
+        print(f"{scale:>4}x {len(dff.index):>7} {full_bytes / 1024:>10.1f} {full_duration * 1000:>10.1f} {sampled_bytes / 1024:>13.1f} {sampled_duration * 1000:>13.1f}")
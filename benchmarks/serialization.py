@@ -0,0 +1,58 @@
+"""
+Benchmarks the payload size and the encoding time of the callback responses, before (built in json encoder, full precision)
+and after (orjson, values rounded to FIGURE_PRECISION decimal places).
+
+Run it from the root of the repository:
+
+    python benchmarks/serialization.py
+"""
+import os
+import sys
+import time
+
+import plotly.io as pio
+from dash._utils import to_json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+REPETITIONS = 20
+
+# The callbacks are called directly with the initial values of the dashboard
+CALLBACKS = [
+        ("world_map (layout)", lambda: [main.generate_world_map()]),
+        ("update_top_5_countries", lambda: main.update_top_5_countries("2020", "Life Ladder")),
+        ("update_biggest_movers", lambda: main.update_biggest_movers("2020", "Life Ladder")),
+        ("update_parallel_coordinate_system", lambda: main.update_parallel_coordinate_system("2020", main.FEATURES_HUMAN_READABLE, {})),
+        ("update_heatmap", lambda: main.update_heatmap("Switzerland")),
+        ("update_scatter_plot", lambda: main.update_scatter_plot("Switzerland", "Life Ladder", "Generosity")),
+        ("update_comparison", lambda: main.update_comparison(main.INITIAL_COMPARED_COUNTRIES, [2005, 2022], "Life Ladder"))
+        ]
+
+def measure(callback, engine, compact):
+    pio.json.config.default_engine = engine
+    main.compact_figure = compact
+    response = callback()
+    if not isinstance(response, list):
+        response = list(response)
+    # The world map is not returned by a callback, so it is compacted here like it is in prepare_layout
+    if compact is not identity and hasattr(response[0], "to_plotly_json"):
+        response = [compact(item) for item in response]
+
+    durations = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        payload = to_json(response)
+        durations.append(time.perf_counter() - start)
+    return len(payload.encode("utf-8")), min(durations)
+
+def identity(fig):
+    return fig
+
+if __name__ == "__main__":
+    compact_figure = main.compact_figure
+    print(f"{'Callback':<36} {'Before (KB)':>12} {'Before (ms)':>12} {'After (KB)':>11} {'After (ms)':>11}")
+    for (name, callback) in CALLBACKS:
+        before_bytes, before_duration = measure(callback, "json", identity)
+        after_bytes, after_duration = measure(callback, "orjson", compact_figure)
+        print(f"{name:<36} {before_bytes / 1024:>12.1f} {before_duration * 1000:>12.2f} {after_bytes / 1024:>11.1f} {after_duration * 1000:>11.2f}")
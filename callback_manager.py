@@ -0,0 +1,71 @@
+import diskcache
+from diskcache.recipes import Lock
+from dash import DiskcacheManager
+
+# Job id handed out to requests whose result is already cached, so no process has to be started at all.
+CACHED_RESULT_JOB = -1
+
+# Job bookkeeping entries (which process computes which key) are removed after this many seconds
+JOB_EXPIRE_SECONDS = 60 * 60
+
+
+class DeduplicatingDiskcacheManager(DiskcacheManager):
+    """
+    Diskcache based background callback manager which shares one computation between identical requests.
+
+    Dash starts a new process for every request of a background callback. Here a request first checks if the result for its
+    cache key is already stored (then no process is started) or if another request is already computing it (then it simply waits
+    for the same process). A process is only killed once every request waiting for it gave up.
+    """
+
+    def call_job_fn(self, key, job_fn, args, context):
+        # The lock makes sure that two identical requests arriving at the same time (even in different gunicorn workers) do not both start a process
+        with Lock(self.handle, f"{key}-lock", expire=JOB_EXPIRE_SECONDS):
+            if self.result_ready(key):
+                return CACHED_RESULT_JOB
+
+            job = self.handle.get(f"{key}-job")
+            if job != None and self.job_running(job):
+                self.handle.incr(f"job-{job}-subscribers")
+                return job
+
+            job = super().call_job_fn(key, job_fn, args, context)
+            self.handle.set(f"{key}-job", job, expire=JOB_EXPIRE_SECONDS)
+            self.handle.set(f"job-{job}-subscribers", 1, expire=JOB_EXPIRE_SECONDS)
+            return job
+
+    def terminate_job(self, job):
+        if job == None or int(job) == CACHED_RESULT_JOB:
+            return
+
+        # Dash also calls this as soon as a request got its result, so we only kill the process when nobody is waiting for it anymore
+        if self.handle.decr(f"job-{int(job)}-subscribers", default=0) > 0:
+            return
+        self.handle.delete(f"job-{int(job)}-subscribers")
+        super().terminate_job(job)
+
+    def job_running(self, job):
+        if job == None or int(job) == CACHED_RESULT_JOB:
+            return False
+        return super().job_running(job)
+
+    def terminate_unhealthy_job(self, job):
+        if job == None or int(job) == CACHED_RESULT_JOB:
+            return False
+        return super().terminate_unhealthy_job(job)
+
+
+def prepare_callback_manager(cache_directory, cache_by, expire):
+    """
+    Returns the manager which runs the background callbacks in separate processes
+        Parameters:
+            cache_directory (str): Directory in which the results are stored
+            cache_by (list): Zero-argument functions whose return values become part of the cache key (e.g the dataset version)
+            expire (int): Number of seconds a result is kept after it was last used
+
+        Returns:
+            manager (DeduplicatingDiskcacheManager): The background callback manager
+    """
+    # Implemented with reference to: https://dash.plotly.com/background-callbacks
+    cache = diskcache.Cache(cache_directory)
+    return DeduplicatingDiskcacheManager(cache, cache_by=cache_by, expire=expire)
@@ -1,4 +1,16 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+from scipy.spatial import cKDTree
 
 # Because we use the built in Choropleth Map we need to provide the Country as a 3 letter ISO notation.
 # See "Using Built-in Country and state Geometry: https://plotly.com/python/choropleth-maps/
@@ -68,7 +80,8 @@ def add_iso_specific_country_columns(data):
     data["country_name_iso"] = data["country_name_iso"].replace(CORRECTED_COUNTRY_NAMES)
 
     # Make a country code column for iso specific notation.
-    data["country_code_iso"] = data.apply(lambda x: get_short_country_code(x["country_name_iso"]), axis=1)
+    # Applied on the column (instead of row wise on the frame) so that this also works for empty chunks in streaming mode.
+    data["country_code_iso"] = data["country_name_iso"].apply(get_short_country_code)
     return data
 
 def rename_columns(data):
@@ -81,8 +94,11 @@ def remove_columns(data):
 
 def fill_in_missing_values(data):
     # Some rows do have missing values we try to fill those in by interpolating
+    # Every country is interpolated on its own, so a missing value is never filled in with the values of another country.
+    # Missing values before the first value of a country (or of a country without any value for a feature) stay missing.
     # Implemented with reference to: https://www.makeuseof.com/fill-missing-data-with-pandas/
-    data.interpolate(method ='linear', limit_direction ='forward', inplace=True)
+    numeric_columns = data.select_dtypes("number").columns
+    data[numeric_columns] = data.groupby("country_name", sort=False)[numeric_columns].transform(lambda country: country.interpolate(method ='linear', limit_direction ='forward'))
     return data
 
 def get_total_number_of_ranks(data, year):
@@ -96,16 +112,23 @@ def calculate_country_ranking(data, country_name, year, feature):
 
     # Create a dictionary which associates a country name with the given feature (e.g <feature_value>: <country_name>)
     # Implemented with reference to: https://cmdlinetips.com/2021/04/convert-two-column-values-from-pandas-dataframe-to-a-dictionary/
-    feature_table = dict(zip(data["country_name"], data[feature]))
+    # Countries without a value for the feature are not ranked
+    feature_table = {country: feature_value for (country, feature_value) in zip(data["country_name"], data[feature]) if not np.isnan(feature_value)}
 
     # Sort them in descending order by the feature value note that this is now a list of tuple pairs
     result = sorted(feature_table.items(), key=lambda x:x[1], reverse=True)
 
     # Now all we have to do is get the index + 1 (because 0 based)  where the country name matches and we have our ranking
-    rank = [index + 1 for (index, (country, feature_value)) in enumerate(result) if country == country_name][0]
+    rank = [index + 1 for (index, (country, feature_value)) in enumerate(result) if country == country_name]
+    if len(rank) == 0:
+        return float("nan")
+    rank = rank[0]
     # Currently this would be terrible for performance at runtime as we build up the dictionary etc. for each for. But because we pre calulate the result and simply lookup the precalculated result at runtime it is fine. 
     return rank 
 
+# All features for which a ranking (and year over year deltas) are precalculated
+RANKED_FEATURES = ["life_ladder", "log_gdp", "social_support", "life_expectancy", "freedom", "generosity", "corruption", "positive_affect", "negative_affect", "confidence_in_government"]
+
 def precalculate_country_ranking(data):
     data["total_number_of_ranks"] = data.apply(lambda x: get_total_number_of_ranks(data, x["year"]), axis=1)
     data["life_ladder_rank"] = data.apply(lambda x: calculate_country_ranking(data, x["country_name"], x["year"], "life_ladder"), axis=1)
@@ -120,25 +143,399 @@ def precalculate_country_ranking(data):
     data["confidence_in_government_rank"] = data.apply(lambda x: calculate_country_ranking(data, x["country_name"], x["year"], "confidence_in_government"), axis=1)
     return data
 
-if __name__ == "__main__":
-    print("Reading in data.csv...")
-    df  = pd.read_csv("./data.csv", encoding="utf-8")
-    print("Removing columns...")
-    df = remove_columns(df)
-    print("Renaming columns...")
-    df = rename_columns(df)
-    print("Removing unneeded countries...")
-    df = remove_countries(df)
-    print("Add iso specific country name...")
-    df = add_iso_specific_country_columns(df)
-    print("Fill in missing values...")
-    df = fill_in_missing_values(df)
-
-    # Precalculate ranking for countries so that we do not have to do this at runtime...
-    print("Precalculate country rankings...")
-    df = precalculate_country_ranking(df)
-
-    # Write out cleaned data and drop index
+def precalculate_year_over_year_deltas(data):
+    # Look up every country in the previous year with one single merge instead of searching it row by row.
+    # Countries which have no data for the previous year get a missing value.
+    rank_columns = [f"{feature}_rank" for feature in RANKED_FEATURES]
+    previous_year = data[["country_name", "year", *RANKED_FEATURES, *rank_columns]].copy()
+    previous_year["year"] = previous_year["year"] + 1
+    previous_year = data[["country_name", "year"]].merge(previous_year, on=["country_name", "year"], how="left")
+
+    for feature in RANKED_FEATURES:
+        data[f"{feature}_delta"] = data[feature].to_numpy() - previous_year[feature].to_numpy()
+        # Rank 1 is the best rank, so a positive rank delta means the country moved up (e.g from rank 5 to rank 3 is +2).
+        # Int64 allows missing values while still writing out the ranks without decimal places.
+        data[f"{feature}_rank_delta"] = pd.Series(previous_year[f"{feature}_rank"].to_numpy() - data[f"{feature}_rank"].to_numpy(), index=data.index).astype("Int64")
+    return data
+
+# The features shown by the dashboard, countries are similar if they are close to each other in this (normalized) feature space
+SIMILARITY_FEATURES = ["life_ladder", "log_gdp", "social_support", "life_expectancy", "freedom", "generosity", "corruption", "positive_affect", "negative_affect"]
+NUMBER_OF_SIMILAR_COUNTRIES = 5
+SIMILAR_COUNTRY_COLUMNS = [f"similar_country_{number}" for number in range(1, NUMBER_OF_SIMILAR_COUNTRIES + 1)]
+
+def precalculate_similar_countries(data):
+    # Every feature is normalized (z-score) within its year, otherwise features with a large range (e.g life expectancy) would dominate the distance
+    features = data[SIMILARITY_FEATURES].astype("float64")
+    grouped_features = features.groupby(data["year"])
+    normalized_features = ((features - grouped_features.transform("mean")) / grouped_features.transform("std", ddof=0)).fillna(0)
+
+    similar_countries = []
+    for (_, year_index) in data.groupby("year").groups.items():
+        points = normalized_features.loc[year_index].to_numpy()
+        country_names = data.loc[year_index, "country_name"].to_numpy()
+        # A k-d tree only has to look at a few countries per query instead of all of them, so this also scales to thousands of regions.
+        # See: https://docs.scipy.org/doc/scipy/reference/generated/scipy.spatial.cKDTree.html
+        tree = cKDTree(points)
+        distances, positions = tree.query(points, k=list(range(1, NUMBER_OF_SIMILAR_COUNTRIES + 2)))
+        # The nearest country is usually the country itself, but with identical values another country could come first, so it is removed by position.
+        # Missing neighbours (a year with too few countries) have the position len(points) and an infinite distance.
+        is_other_country = positions != np.arange(len(points))[:, None]
+        order = np.argsort(~is_other_country, axis=1, kind="stable")[:, :NUMBER_OF_SIMILAR_COUNTRIES]
+        positions = np.take_along_axis(positions, order, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+        names = np.append(country_names, None)[positions]
+        distances[positions == len(points)] = np.nan
+
+        year_similar_countries = pd.DataFrame(index=year_index)
+        for (number, column) in enumerate(SIMILAR_COUNTRY_COLUMNS):
+            year_similar_countries[column] = names[:, number]
+            year_similar_countries[f"{column}_distance"] = distances[:, number]
+        similar_countries.append(year_similar_countries)
+
+    return data.join(pd.concat(similar_countries))
+
+# Value ranges of the features as documented in the World Happiness Report, they are deliberately wide so that only broken data is rejected
+FEATURE_RANGES = {
+        "life_ladder": (0, 10),
+        "log_gdp": (0, 15),
+        "social_support": (0, 1),
+        "life_expectancy": (0, 100),
+        "freedom": (0, 1),
+        "generosity": (-1, 1),
+        "corruption": (0, 1),
+        "positive_affect": (0, 1),
+        "negative_affect": (0, 1),
+        "confidence_in_government": (0, 1)
+        }
+
+def column_schema(dtype, minimum=None, maximum=None, nullable=False):
+    # A bound is either a number or the name of another column (e.g a rank can not be larger than the number of ranks in that year)
+    return {"dtype": dtype, "min": minimum, "max": maximum, "nullable": nullable}
+
+# Declarative schema of the cleaned dataset. It is written out next to data_cleaned.csv and checked by the dashboard when loading the data.
+# Every column is required, (country_name, year) has to be unique.
+# Explicit dtypes of the cleaned dataset, they are written out next to the data in data_cleaned.schema.json so that the dashboard can load it with them.
+# The features are only ever displayed with two decimal places, so float32 (~7 significant digits) is more than enough. Ranks and years fit into int16
+# (also for regional level data). Features of countries without any data to interpolate from are missing, so they and their ranks are nullable (Int16 for the
+# ranks), as are the rank deltas, as there is no delta without data of the previous year.
+CLEANED_DATASET_SCHEMA = {
+        "columns": {
+            "country_name": column_schema("category"),
+            "year": column_schema("int16", minimum=2005),
+            # Missing values are only interpolated within a country, so e.g the first year of a country can miss a feature
+            **{feature: column_schema("float32", *FEATURE_RANGES[feature], nullable=True) for feature in RANKED_FEATURES},
+            "country_name_iso": column_schema("category"),
+            "country_code_iso": column_schema("category"),
+            "total_number_of_ranks": column_schema("int16", minimum=1),
+            **{f"{feature}_rank": column_schema("Int16", minimum=1, maximum="total_number_of_ranks", nullable=True) for feature in RANKED_FEATURES},
+            # The first year of a country has no previous year to compare with
+            **{f"{feature}_delta": column_schema("float32", nullable=True) for feature in RANKED_FEATURES},
+            **{f"{feature}_rank_delta": column_schema("Int16", nullable=True) for feature in RANKED_FEATURES},
+            # A year with only a few countries has less similar countries
+            **{column: column_schema("category", nullable=True) for column in SIMILAR_COUNTRY_COLUMNS},
+            **{f"{column}_distance": column_schema("float32", minimum=0, nullable=True) for column in SIMILAR_COUNTRY_COLUMNS}
+            },
+        "unique": ["country_name", "year"]
+        }
+
+CLEANED_DATASET_DTYPES = {column: spec["dtype"] for (column, spec) in CLEANED_DATASET_SCHEMA["columns"].items()}
+
+def apply_dtypes(data):
+    # Ranks and deltas are calculated before, so they are still based on the full precision values
+    return data.astype(CLEANED_DATASET_DTYPES)
+
+def write_schema(path, dataset_path):
+    # The hash ties the schema to the snapshot it was written for, the dashboard uses it as the dataset version (e.g for its caches)
+    with open(dataset_path, "rb") as f:
+        version = hashlib.sha1(f.read()).hexdigest()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, **CLEANED_DATASET_SCHEMA}, f, indent=4)
+
+# Every cleaning stage in the order it has to run. The third entry tells by which column the data can be partitioned
+# so that the partitions can be processed independently of each other (None means the stage needs to see the entire data).
+CLEANING_STAGES = [
+        ("Removing columns", remove_columns, None),
+        ("Renaming columns", rename_columns, None),
+        ("Removing unneeded countries", remove_countries, None),
+        ("Add iso specific country name", add_iso_specific_country_columns, "country_name"),
+        # Every country is interpolated on its own, a single groupby over the entire data is faster than splitting it up by country (~0.1s instead of ~1s)
+        ("Fill in missing values", fill_in_missing_values, None),
+        # Precalculate ranking for countries so that we do not have to do this at runtime...
+        ("Precalculate country rankings", precalculate_country_ranking, "year"),
+        # The nearest neighbours are searched among the countries of the same year
+        ("Precalculate similar countries", precalculate_similar_countries, "year"),
+        # A single merge over the entire data is much faster than splitting it up by country (~0.02s instead of ~2s)
+        ("Precalculate year over year deltas", precalculate_year_over_year_deltas, None),
+        # Categories are specific to a partition, so this is done on the merged data
+        ("Apply precision reduced dtypes", apply_dtypes, None)
+        ]
+
+def partition_data(data, column):
+    # Partitions are returned in the order in which they first appear in the data (sort=False) so that the result is deterministic.
+    # We copy each partition so that the stages can safely add columns to it.
+    return [partition.copy() for (_, partition) in data.groupby(column, sort=False)]
+
+def merge_partitions(partitions, index):
+    # Restore the original row order so that the result is identical to a serial run
+    return pd.concat(partitions).loc[index]
+
+def map_partitions(function, partitions, executor):
+    if executor == None:
+        return [function(partition) for partition in partitions]
+    return list(executor.map(function, partitions))
+
+def run_stage(stage, data, partition_column, executor):
+    if partition_column == None:
+        return stage(data)
+
+    partitions = partition_data(data, partition_column)
+    results = map_partitions(stage, partitions, executor)
+    return merge_partitions(results, data.index)
+
+def run_pipeline(data, workers=1):
+    # With more than one worker the partitioned stages are executed in a process pool.
+    # The pool is shared by all stages so that we only pay for starting the processes once.
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    timings = []
+    try:
+        for (description, stage, partition_column) in CLEANING_STAGES:
+            print(f"{description}...")
+            start = time.perf_counter()
+            data = run_stage(stage, data, partition_column, executor)
+            timings.append((description, time.perf_counter() - start))
+    finally:
+        if executor != None:
+            executor.shutdown()
+    return data, timings
+
+def print_timings(timings):
+    print("Timings per stage:")
+    for (description, duration) in timings:
+        print(f"  {description:<40} {duration:8.3f}s")
+    print(f"  {'Total':<40} {sum(duration for (_, duration) in timings):8.3f}s")
+
+# Stages which only look at a single row at a time. In streaming mode these are applied to each chunk on its own.
+ROW_LOCAL_STAGES = CLEANING_STAGES[:4]
+
+def interpolate_chunks(chunks):
+    """
+    Fills in missing values chunk by chunk, the result is identical to running fill_in_missing_values on the entire data at once.
+
+    Every chunk is yielded right away together with the values which could only now be filled in for rows of earlier chunks (as row, year, column, value).
+    Missing values after the last valid value of a country in a column are not final until the next valid value of that country arrives, so until then
+    only their row and year are kept, never the entire rows.
+    """
+    # Per country and column the last valid value so far and the rows (and their years) of the missing values after it
+    anchors = {}
+    pending = {}
+    chunk = None
+    for chunk in chunks:
+        chunk = chunk.copy()
+        years = chunk["year"].to_numpy()
+        countries = chunk.groupby("country_name", sort=False).indices
+        fills = []
+        for column in chunk.select_dtypes("number").columns:
+            values = chunk[column].to_numpy(dtype="float64", copy=True)
+            for (country_name, positions) in countries.items():
+                key = (country_name, column)
+                country_values = values[positions]
+                valid_positions = np.flatnonzero(~np.isnan(country_values))
+                if len(valid_positions) == 0:
+                    # Missing values before the first valid value of a country stay missing anyway (we only interpolate forward)
+                    if key in anchors:
+                        pending[key].append((chunk.index[positions], years[positions]))
+                    continue
+
+                first = valid_positions[0]
+                last = valid_positions[-1]
+                if key in anchors:
+                    # The gap between the last valid value of the country in the previous chunks and its first one in this chunk
+                    pending_index = np.concatenate([index for (index, _) in pending[key]])
+                    pending_years = np.concatenate([year for (_, year) in pending[key]])
+                    gap = len(pending_index) + first
+                    # Same arithmetic as the interpolation of the entire data (numpy.interp), only relative to the last valid value
+                    interpolated = np.interp(np.arange(1, gap + 1), [0, gap + 1], [anchors[key], country_values[first]])
+                    if len(pending_index) > 0:
+                        fills.append(pd.DataFrame({"year": pending_years, "column": column, "value": interpolated[:len(pending_index)]}, index=pending_index))
+                    country_values[:first] = interpolated[len(pending_index):]
+                country_values[first:last + 1] = np.interp(np.arange(first, last + 1), valid_positions, country_values[valid_positions])
+                anchors[key] = country_values[last]
+                pending[key] = [(chunk.index[positions[last + 1:]], years[positions[last + 1:]])]
+                values[positions] = country_values
+
+            # Only touch columns which really had missing values, otherwise pandas would turn e.g the year into a float
+            if chunk[column].isna().any():
+                chunk[column] = values
+        yield chunk, concat_fills(fills)
+
+    if chunk is not None:
+        # After the last valid value of a country its value is carried forward
+        fills = []
+        for ((country_name, column), rows) in pending.items():
+            pending_index = np.concatenate([index for (index, _) in rows])
+            if len(pending_index) > 0:
+                pending_years = np.concatenate([year for (_, year) in rows])
+                fills.append(pd.DataFrame({"year": pending_years, "column": column, "value": anchors[(country_name, column)]}, index=pending_index))
+        yield chunk.iloc[:0], concat_fills(fills)
+
+def concat_fills(fills):
+    if len(fills) == 0:
+        return pd.DataFrame({"year": pd.Series(dtype="int64"), "column": pd.Series(dtype="object"), "value": pd.Series(dtype="float64")})
+    return pd.concat(fills)
+
+def spill_by_year(data, directory, part, prefix="part"):
+    # The index (the row number in the raw file) is kept so that we are able to restore the original row order later on
+    for (year, partition) in data.groupby("year"):
+        year_directory = os.path.join(directory, f"year={year}")
+        os.makedirs(year_directory, exist_ok=True)
+        partition.to_parquet(os.path.join(year_directory, f"{prefix}-{part:05d}.parquet"))
+
+def apply_fills(partition, year_directory):
+    # Missing values which were only filled in once a later chunk brought in the next valid value of their column
+    paths = sorted(glob.glob(os.path.join(year_directory, "fills-*.parquet")))
+    if len(paths) == 0:
+        return partition
+    fills = pd.concat([pd.read_parquet(path) for path in paths])
+    for (column, column_fills) in fills.groupby("column"):
+        partition.loc[column_fills.index, column] = column_fills["value"]
+    return partition
+
+def rank_year_partition(year_directory):
+    # A single year is the unit which has to fit into memory, the ranking needs to compare all countries of a year.
+    partition = pd.concat([pd.read_parquet(path) for path in sorted(glob.glob(os.path.join(year_directory, "part-*.parquet")))]).sort_index()
+    partition = apply_fills(partition, year_directory)
+    partition = precalculate_country_ranking(partition)
+    partition = precalculate_similar_countries(partition)
+    path = f"{year_directory}.parquet"
+    partition.to_parquet(path)
+    return path
+
+def add_deltas_to_year_partition(paths):
+    # The deltas of a year only need the ranked partition of the previous year next to it
+    path, previous_path = paths
+    partition = pd.read_parquet(path)
+    if previous_path != None:
+        previous_partition = pd.read_parquet(previous_path)
+        partition = precalculate_year_over_year_deltas(pd.concat([previous_partition, partition]))
+        partition = partition[partition["year"] == partition["year"].max()]
+    else:
+        partition = precalculate_year_over_year_deltas(partition)
+    # The ranked partition may still be read by the task of the following year, so the result goes into a new file
+    deltas_path = f"{path.removesuffix('.parquet')}-deltas.parquet"
+    partition.to_parquet(deltas_path)
+    return deltas_path
+
+def read_parquet_batches(path, batch_size):
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        if batch.num_rows > 0:
+            yield batch.to_pandas()
+
+def merge_sorted_partitions(paths, batch_size):
+    """
+    Merges partitions which are each sorted by their index into a stream of batches sorted by index, reading only one batch per partition at a time.
+    """
+    streams = [read_parquet_batches(path, batch_size) for path in paths]
+    buffers = [next(stream, None) for stream in streams]
+    while any(buffer is not None for buffer in buffers):
+        active = [index for (index, buffer) in enumerate(buffers) if buffer is not None]
+        # Every row up to the smallest "last row" of all buffers is already loaded, so it is safe to emit them.
+        boundary = min(buffers[index].index[-1] for index in active)
+        ready = []
+        for index in active:
+            buffer = buffers[index]
+            ready.append(buffer[buffer.index <= boundary])
+            rest = buffer[buffer.index > boundary]
+            buffers[index] = rest if not rest.empty else next(streams[index], None)
+        yield pd.concat(ready).sort_index()
+
+def run_streaming_pipeline(input_path, output_path, staging_directory, chunk_size, workers=1):
+    """
+    Streaming version of run_pipeline for inputs which do not fit into memory.
+
+    The raw file is read in chunks and the row local stages as well as the interpolation are applied per chunk.
+    The result is spilled to a parquet staging area partitioned by year, ranked one year at a time and finally merged back into the original row order.
+    The year over year deltas only need two neighbouring year partitions at a time.
+    """
+    timings = {description: 0.0 for (description, _, _) in CLEANING_STAGES}
+    timings["Writing out cleaned version"] = 0.0
+    interpolated_directory = os.path.join(staging_directory, "interpolated")
+
+    def cleaned_chunks():
+        for chunk in pd.read_csv(input_path, encoding="utf-8", chunksize=chunk_size):
+            for (description, stage, _) in ROW_LOCAL_STAGES:
+                start = time.perf_counter()
+                chunk = stage(chunk)
+                timings[description] += time.perf_counter() - start
+            yield chunk
+
+    print("Streaming chunks through the row local stages and filling in missing values...")
+    chunks = interpolate_chunks(cleaned_chunks())
+    part = 0
+    while True:
+        start = time.perf_counter()
+        interpolated = next(chunks, None)
+        if interpolated is None:
+            break
+        (rows, fills) = interpolated
+        spill_by_year(rows, interpolated_directory, part)
+        spill_by_year(fills, interpolated_directory, part, prefix="fills")
+        part += 1
+        timings["Fill in missing values"] += time.perf_counter() - start
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        print("Precalculate country rankings...")
+        start = time.perf_counter()
+        year_directories = sorted(glob.glob(os.path.join(interpolated_directory, "year=*")))
+        ranked_paths = map_partitions(rank_year_partition, year_directories, executor)
+        timings["Precalculate country rankings"] += time.perf_counter() - start
+
+        print("Precalculate year over year deltas...")
+        start = time.perf_counter()
+        years = [int(os.path.basename(year_directory).removeprefix("year=")) for year_directory in year_directories]
+        previous_paths = {year + 1: path for (year, path) in zip(years, ranked_paths)}
+        deltas_paths = map_partitions(add_deltas_to_year_partition, [(path, previous_paths.get(year, None)) for (year, path) in zip(years, ranked_paths)], executor)
+        timings["Precalculate year over year deltas"] += time.perf_counter() - start
+    finally:
+        if executor != None:
+            executor.shutdown()
+
     print("Writing out cleaned version...")
-    df.to_csv("./data_cleaned.csv", index=False)
+    start = time.perf_counter()
+    header = True
+    for batch in merge_sorted_partitions(deltas_paths, chunk_size):
+        batch = apply_dtypes(batch)
+        batch.to_csv(output_path, index=False, header=header, mode="w" if header else "a")
+        header = False
+    timings["Writing out cleaned version"] += time.perf_counter() - start
+
+    # Stages which only consist of a rename etc. are attributed to the chunks they ran on, the interpolation timing also includes spilling.
+    # The similar countries are searched within the year partitions together with the rankings, so they are part of the ranking timing.
+    return list(timings.items())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cleans up the World Happiness Report dataset for the dashboard.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes used for the partitioned stages (default: 1, which runs everything in this process)")
+    parser.add_argument("--stream", action="store_true", help="Read data.csv in chunks and spill to an on-disk staging area instead of keeping everything in memory")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Number of rows per chunk in streaming mode (default: 50000)")
+    parser.add_argument("--staging-directory", default=None, help="Directory for the staging area in streaming mode (default: a temporary directory)")
+    args = parser.parse_args()
+
+    if args.stream:
+        with tempfile.TemporaryDirectory(dir=args.staging_directory) as staging_directory:
+            timings = run_streaming_pipeline("./data.csv", "./data_cleaned.csv", staging_directory, args.chunk_size, workers=args.workers)
+    else:
+        print("Reading in data.csv...")
+        df  = pd.read_csv("./data.csv", encoding="utf-8")
+
+        df, timings = run_pipeline(df, workers=args.workers)
+
+        # Write out cleaned data and drop index
+        print("Writing out cleaned version...")
+        df.to_csv("./data_cleaned.csv", index=False)
+
+    print("Writing out schema...")
+    write_schema("./data_cleaned.schema.json", "./data_cleaned.csv")
+
+    print_timings(timings)
     print("Done")
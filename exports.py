@@ -0,0 +1,154 @@
+import tempfile
+import threading
+
+import diskcache
+import flask
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Number of rows which are converted at once, only one chunk of an export is held in memory as text at a time
+EXPORT_CHUNK_SIZE = 500
+
+# Exports are copied from the cache to the response in blocks of this many bytes
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# How long a request waits for another export to be generated, afterwards it is asked to retry later (503 Service Unavailable)
+GENERATE_TIMEOUT_SECONDS = 5
+
+MIMETYPES = {
+        "csv": "text/csv",
+        "parquet": "application/vnd.apache.parquet",
+        "png": "image/png",
+        "svg": "image/svg+xml"
+        }
+
+
+def csv_chunks(data, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the data as CSV, one chunk of rows at a time
+        Parameters:
+            data (DataFrame): The data to export
+            chunk_size (int): The number of rows per chunk
+
+        Returns:
+            chunks (generator): The encoded CSV, the first chunk contains the header
+    """
+    yield data.iloc[:0].to_csv(index=False).encode("utf-8")
+    for start in range(0, len(data), chunk_size):
+        yield data.iloc[start:start + chunk_size].to_csv(index=False, header=False).encode("utf-8")
+
+
+class ChunkSink:
+    """
+    Write-only file which collects everything written to it until it is drained, so that a parquet file can be passed on while it is written.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # pyarrow records the offsets of the row groups in the footer, so the position has to include everything that was already drained
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        chunk = b"".join(self.chunks)
+        self.chunks = []
+        return chunk
+
+
+def parquet_chunks(data, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the data as a parquet file, every chunk of rows is written as its own row group
+        Parameters:
+            data (DataFrame): The data to export
+            chunk_size (int): The number of rows per row group
+
+        Returns:
+            chunks (generator): The bytes of the parquet file, the last chunk contains the footer
+    """
+    # Implemented with reference to: https://arrow.apache.org/docs/python/generated/pyarrow.parquet.ParquetWriter.html
+    schema = pa.Schema.from_pandas(data, preserve_index=False)
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for start in range(0, len(data), chunk_size):
+            writer.write_table(pa.Table.from_pandas(data.iloc[start:start + chunk_size], schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def read_blocks(handle):
+    with handle:
+        while True:
+            block = handle.read(STREAM_BLOCK_SIZE)
+            if len(block) == 0:
+                return
+            yield block
+
+
+class ExportCache:
+    """
+    Stores generated exports on disk per dataset version, so that repeated downloads are streamed from a file instead of being generated again.
+
+    Only a few exports are generated at the same time (per process) and requests only wait for a short time for their turn, so bulk
+    downloads can not occupy every thread of a worker and the interactive callbacks still get theirs.
+    """
+
+    def __init__(self, directory, cache_by, expire, concurrency=1):
+        self.cache = diskcache.Cache(directory)
+        self.cache_by = cache_by
+        self.expire = expire
+        self.generating = threading.BoundedSemaphore(concurrency)
+
+    def get_or_generate(self, key, generate_chunks):
+        # Implemented with reference to: https://grantjenks.com/docs/diskcache/tutorial.html#cache (read=True stores and returns files)
+        key = (*[function() for function in self.cache_by], *key)
+        handle = self.cache.get(key, read=True)
+        if handle != None:
+            return handle
+
+        if not self.generating.acquire(timeout=GENERATE_TIMEOUT_SECONDS):
+            flask.abort(flask.Response("Too many exports are generated at the moment, please try again later", status=503, headers={"Retry-After": str(GENERATE_TIMEOUT_SECONDS)}))
+        try:
+            # Another request could have generated the same export while this one was waiting
+            handle = self.cache.get(key, read=True)
+            if handle != None:
+                return handle
+            # The chunks are spooled to a temporary file, so a large export is never entirely in memory
+            with tempfile.TemporaryFile() as f:
+                for chunk in generate_chunks():
+                    f.write(chunk)
+                f.seek(0)
+                self.cache.set(key, f, read=True, expire=self.expire)
+            return self.cache.get(key, read=True)
+        finally:
+            self.generating.release()
+
+    def response(self, key, filename, file_format, generate_chunks):
+        """
+        Returns a response which streams the export as a download
+            Parameters:
+                key (tuple): Identifies the export (e.g the view, its parameters and the format), the dataset version is added automatically
+                filename (str): The name of the downloaded file
+                file_format (str): One of the keys of MIMETYPES
+                generate_chunks (function): Zero-argument function returning the chunks of the export, it is only called if the export is not cached yet
+
+            Returns:
+                response (Response): The streamed download
+        """
+        handle = self.get_or_generate(key, generate_chunks)
+        response = flask.Response(read_blocks(handle), mimetype=MIMETYPES[file_format])
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,40 @@
+# Gunicorn configuration, it is picked up automatically when gunicorn is started from the root of the repository.
+# See: https://docs.gunicorn.org/en/stable/settings.html
+#
+# The deployment profile is selected with the WEB_PROFILE environment variable (e.g WEB_PROFILE=processes gunicorn main:server).
+# The callbacks mostly spend their time in CPU bound pandas and plotly code, which holds the GIL. Threads therefore mostly help
+# to keep cheap lookups from waiting behind a slow request, additional cores are only used by additional processes.
+# See the README for the measurements of benchmarks/load_test.py with the different profiles.
+#
+# There is deliberately no gevent profile: The CPU bound callbacks never yield to other greenlets, and the background callbacks
+# fork their job processes from the worker, which inherits the monkey patched hub of the gevent worker and exits before the job is done.
+import multiprocessing
+import os
+
+CORES = multiprocessing.cpu_count()
+
+PROFILES = {
+        # A single process handling one request at a time (the gunicorn default)
+        "sync": {"worker_class": "sync", "workers": 1, "threads": 1},
+        # One process per core, each with a few threads so that cheap lookups do not wait behind a slow request
+        "gthread": {"worker_class": "gthread", "workers": CORES, "threads": 4},
+        # Only processes, the recommendation of the gunicorn documentation for sync workers
+        "processes": {"worker_class": "sync", "workers": 2 * CORES + 1, "threads": 1}
+        }
+
+# Unmeasured: on a single core the load harness shows no difference between the profiles (see the README), gthread is only
+# expected to be the better default on machines with more cores. Run benchmarks/load_test.py on the target machine before relying on it.
+DEFAULT_PROFILE = "gthread"
+
+profile = PROFILES[os.environ.get("WEB_PROFILE", DEFAULT_PROFILE)]
+
+worker_class = profile["worker_class"]
+# Heroku sets WEB_CONCURRENCY depending on the dyno size, it takes precedence over the profile
+workers = int(os.environ.get("WEB_CONCURRENCY", profile["workers"]))
+threads = profile["threads"]
+
+# Load the dataset once in the master process, the workers then share it via copy-on-write after forking
+preload_app = True
+
+# Plotly serialization of large figures can take a while
+timeout = 60
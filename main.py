@@ -1,19 +1,53 @@
-from dash import Dash, dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, ctx, no_update
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
 import pandas as pd
 import dash_bootstrap_components as dbc
 import json
+import hashlib
+import functools
+from operator import itemgetter
+import flask
+
+from callback_manager import prepare_callback_manager
+from page_cache import MemoizedLayoutDash, FingerprintedAssets
+from exports import ExportCache, csv_chunks, parquet_chunks
 
 # Initial values 
 INITIAL_COUNTRY_NAME = "Switzerland"
 INITIAL_FROM_VALUE = "2020"
 INITIAL_FIRST_FEATURE = "Life Ladder"
 INITIAL_SECOND_FEATURE = "Generosity"
+INITIAL_COMPARED_COUNTRIES = ["Switzerland", "Germany", "Finland"]
 
 # Initial centered country on the mapbox based choropleth map (Switzerland)
 INITIAL_CENTERED_COUNTRY = {"lat": 46.8182, "lon": 8.2275}
 
 HEIGHT_CHOROPLETH_MAP = 950
+# The similar countries are shown below the country detail, together they are as high as the map
+HEIGHT_SIMILAR_COUNTRIES = 320
+
+# Above this number of rows the parallel coordinate system only shows a stratified sample (the browser struggles with thousands of lines).
+# The full resolution data is only shown for the subset the user brushed.
+PARALLEL_COORDINATES_MAX_LINES = 500
+# Number of life ladder quantiles the sample is stratified by, so that every part of the color scale stays represented.
+PARALLEL_COORDINATES_STRATA = 10
+
+# Number of decimal places kept in the data of the figures. The dashboard shows values with two decimal places, one more keeps the hover values meaningful.
+FIGURE_PRECISION = 3
+
+# Dash serializes the callback responses with plotly's JSON encoder, orjson is much faster than the built in json module.
+# See: https://plotly.com/python/renderers/#json-engine
+pio.json.config.default_engine = "orjson"
+
+# Number of countries which moved up (and down) the most, shown in the biggest movers view
+NUMBER_OF_BIGGEST_MOVERS = 5
+
+# Windows (number of years up to and including the selected year) over which the global correlations and regressions are calculated
+GLOBAL_ANALYTICS_WINDOWS = [1, 3, 5]
+INITIAL_GLOBAL_ANALYTICS_WINDOW = 1
 
 # Will be displayed in the Dropdowns in a more human readable form
 FEATURES_HUMAN_READABLE = ["Life Ladder", "Log GDP", "Social Support", "Life Expectancy", "Freedom to Make Life Choices", "Generosity", "Perception of Corruption", "Positive Affect", "Negative Affect"]
@@ -55,9 +89,28 @@ Z_INDEX_FILTER = 3
 OVERLAY_SHOWN_STYLE = {"top": 0, "left": 0, "bottom": 0, "width": "99%", "zIndex": Z_INDEX_OVERLAY, "display": "flex"}
 OVERLAY_HIDDEN_STYLE = {"top": 0, "left": 0, "bottom": 0, "width": "99%", "zIndex": Z_INDEX_OVERLAY, "display": "none"}
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# The expensive views run as background callbacks in separate processes, their results are stored on disk.
+# Identical requests share one computation and the results are kept per dataset version.
+CACHE_DIRECTORY = "./cache"
+CACHE_EXPIRE_SECONDS = 60 * 60
+# How often (in milliseconds) the browser asks for the result of a background callback
+BACKGROUND_CALLBACK_INTERVAL = 250
+
+background_callback_manager = prepare_callback_manager(CACHE_DIRECTORY, cache_by=[lambda: dataset_version], expire=CACHE_EXPIRE_SECONDS)
+
+# Downloads of the data and figures behind the views are generated once per dataset version and then streamed from the disk, see exports.py
+EXPORT_CACHE_DIRECTORY = f"{CACHE_DIRECTORY}/exports"
+DATA_EXPORT_FORMATS = ["csv", "parquet"]
+IMAGE_EXPORT_FORMATS = ["png", "svg"]
+EXPORT_IMAGE_WIDTH = 1200
+EXPORT_IMAGE_HEIGHT = 700
+export_cache = ExportCache(EXPORT_CACHE_DIRECTORY, cache_by=[lambda: dataset_version], expire=CACHE_EXPIRE_SECONDS)
+
+# The layout is serialized once per dataset version and then served from memory, see page_cache.py
+app = MemoizedLayoutDash(__name__, layout_version=lambda: dataset_version, external_stylesheets=[dbc.themes.BOOTSTRAP], background_callback_manager=background_callback_manager)
 app.title = "Msc FHGR - World Happiness Dashboard"
 server = app.server
+fingerprinted_assets = FingerprintedAssets(app)
 
 
 def get_ranking_explanation(feature_human_readable):
@@ -116,15 +169,442 @@ def get_country_years(data):
     unique_country_years = list(sorted(set(data["year"])))
     return unique_country_years 
 
-def prepare_dataset():
+def get_dataset_version(path):
+    """
+    Returns a version of the dataset which changes whenever the content of the file changes
+        Parameters:
+            path (str): Path to the cleaned up version of the World Happiness Report dataset
+
+        Returns:
+            version (str): The SHA-1 hash of the file content
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_dataset_schema(schema_path, dataset_path):
+    """
+    Loads the schema written out by data_cleaning.py and makes sure that it belongs to the dataset (a refresh could have only replaced one of the files)
+        Parameters:
+            schema_path (str): Path to the schema of the cleaned up dataset
+            dataset_path (str): Path to the cleaned up version of the World Happiness Report dataset
+
+        Returns:
+            schema (dict): The schema with the columns (dtype, value range and if missing values are allowed), the unique columns and the dataset version
+    """
+    with open(schema_path, encoding="UTF-8") as f:
+        schema = json.load(f)
+    dataset_version = get_dataset_version(dataset_path)
+    if dataset_version != schema["version"]:
+        raise ValueError(f"{dataset_path} (version {dataset_version}) does not belong to {schema_path} (version {schema['version']}), please run data_cleaning.py again")
+    return schema
+
+def count_out_of_range(numbers, numeric_columns, limits, is_out_of_range):
+    """
+    Returns the number of values out of range for every column, by comparing all columns with the same kind of limit at once
+        Parameters:
+            numbers (ndarray): The numeric columns of the dataset as one float64 block (as returned by validate_dataset)
+            numeric_columns (list): The names of the columns of the block
+            limits (dict): Associates a column with its limit, which is either a number or the name of another column
+            is_out_of_range (ufunc): The comparison which tells if a value is out of range (np.less for a minimum, np.greater for a maximum)
+
+        Returns:
+            number_of_violations (Series): The number of values out of range per column (missing values are never out of range)
+    """
+    positions = {column: position for (position, column) in enumerate(numeric_columns)}
+    numeric_limits = {column: limit for (column, limit) in limits.items() if not isinstance(limit, str)}
+    counts = [pd.Series(is_out_of_range(numbers[:, [positions[column] for column in numeric_limits]], list(numeric_limits.values())).sum(axis=0), index=list(numeric_limits), dtype="int64")]
+    # Columns whose limit is another column (e.g a rank can not be larger than the number of ranks in that year) are compared row by row
+    for limit_column in set(limit for limit in limits.values() if isinstance(limit, str)):
+        limited_columns = [column for (column, limit) in limits.items() if limit == limit_column]
+        counts.append(pd.Series(is_out_of_range(numbers[:, [positions[column] for column in limited_columns]], numbers[:, [positions[limit_column]]]).sum(axis=0), index=limited_columns))
+    return pd.concat(counts)
+
+def validate_dataset(data, schema):
+    """
+    Checks the dataset against its schema once at load time, so that a malformed dataset fails right away instead of in a callback later on.
+    Every check compares entire columns at once, for the current dataset they take ~4ms in total (loading the CSV takes ~12ms).
+        Parameters:
+            data (DataFrame): DataFrame constructed from the cleaned up version of the World Happiness Report dataset
+            schema (dict): The schema returned by load_dataset_schema
+
+        Returns:
+            numbers (ndarray): The numeric columns of the schema as one float64 block, in the order of the schema
+
+        Raises:
+            ValueError: If the dataset does not match the schema, the message lists every violation
+    """
+    columns = schema["columns"]
+    # The remaining checks need all columns to be there
+    missing_columns = [column for column in columns if column not in data.columns]
+    if len(missing_columns) > 0:
+        raise ValueError(f"The dataset is missing the columns: {', '.join(missing_columns)}")
+
+    violations = []
+    # The values are checked before they are cast to the dtypes of the schema, a narrow dtype would silently wrap them (e.g 65537 becomes 1 as int16)
+    numeric_columns = [column for (column, spec) in columns.items() if spec["dtype"] != "category"]
+    # read_csv already parses the numeric columns as int64 or float64, so they are converted into a single float64 block (which holds every int16 exactly)
+    # at once. Only columns which also contain something else than numbers are read as object and have to be converted one by one.
+    object_columns = [column for (column, dtype) in data.dtypes[numeric_columns].items() if not pd.api.types.is_numeric_dtype(dtype)]
+    numbers = data[numeric_columns]
+    for column in object_columns:
+        converted_column = pd.to_numeric(data[column], errors="coerce")
+        count = (converted_column.isna() & data[column].notna()).sum()
+        if count > 0:
+            violations.append(f"{column} has {count} values which are not numbers")
+        numbers = numbers.assign(**{column: converted_column})
+    numbers = numbers.to_numpy("float64")
+
+    is_missing = np.isnan(numbers)
+    is_integer_column = np.array([columns[column]["dtype"].lower().startswith("int") for column in numeric_columns])
+    number_of_fractions = pd.Series(((numbers != np.round(numbers)) & ~is_missing & is_integer_column).sum(axis=0), index=numeric_columns)
+    for (column, count) in number_of_fractions[number_of_fractions > 0].items():
+        violations.append(f"{column} has {count} values which are not integers")
+
+    # The range of the dtype itself (e.g -32768 to 32767 for int16)
+    dtype_ranges = [(np.iinfo if is_integer else np.finfo)(columns[column]["dtype"].lower()) for (column, is_integer) in zip(numeric_columns, is_integer_column)]
+    number_of_overflows = pd.Series(((numbers < [dtype_range.min for dtype_range in dtype_ranges]) | (numbers > [dtype_range.max for dtype_range in dtype_ranges])).sum(axis=0), index=numeric_columns)
+    for (column, count) in number_of_overflows[number_of_overflows > 0].items():
+        violations.append(f"{column} has {count} values which do not fit into {columns[column]['dtype']}")
+
+    number_of_missing_values = data[[column for (column, spec) in columns.items() if not spec["nullable"]]].isna().sum()
+    for (column, count) in number_of_missing_values[number_of_missing_values > 0].items():
+        violations.append(f"{column} has {count} missing values")
+
+    for (bound, is_out_of_range) in (("min", np.less), ("max", np.greater)):
+        limits = {column: spec[bound] for (column, spec) in columns.items() if spec[bound] != None}
+        number_of_violations = count_out_of_range(numbers, numeric_columns, limits, is_out_of_range)
+        for (column, count) in number_of_violations[number_of_violations > 0].items():
+            violations.append(f"{column} has {count} values out of range ({bound} {limits[column]})")
+
+    number_of_duplicates = data.duplicated(subset=schema["unique"]).sum()
+    if number_of_duplicates > 0:
+        violations.append(f"{number_of_duplicates} rows have the same {', '.join(schema['unique'])} as another row")
+
+    if len(violations) > 0:
+        raise ValueError("The dataset does not match its schema:\n" + "\n".join(violations))
+    return numbers
+
+def cast_dataset(data, numbers, schema):
+    """
+    Returns the dataset cast to the dtypes of its schema, the numeric columns are taken from the float64 block which was already validated
+    instead of casting every column of the CSV again (~4ms instead of ~11ms with DataFrame.astype, which is slow for the nullable Int16 ranks).
+        Parameters:
+            data (DataFrame): DataFrame constructed from the cleaned up version of the World Happiness Report dataset
+            numbers (ndarray): The numeric columns of the schema as one float64 block (as returned by validate_dataset)
+            schema (dict): The schema returned by load_dataset_schema
+
+        Returns:
+            data (DataFrame): The dataset with the dtypes of the schema
     """
-    Loads the cleaned up version of the World Happiness Report dataset and sorts the values by year in ascending order.
+    columns = schema["columns"]
+    numeric_columns = [column for (column, spec) in columns.items() if spec["dtype"] != "category"]
+    is_missing = np.isnan(numbers)
+    # The columns keep the order of the CSV, columns which are not part of the schema are kept as they are
+    cast_columns = {}
+    for column in data.columns:
+        dtype = pd.api.types.pandas_dtype(columns[column]["dtype"]) if column in columns else None
+        if dtype == None:
+            cast_columns[column] = data[column]
+        elif isinstance(dtype, pd.CategoricalDtype):
+            cast_columns[column] = pd.Categorical(data[column])
+            continue
+        position = numeric_columns.index(column)
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            # A nullable integer column consists of its values and a mask of the missing ones (See: https://pandas.pydata.org/docs/user_guide/integer_na.html)
+            values = np.where(is_missing[:, position], 0, numbers[:, position]).astype(dtype.numpy_dtype)
+            cast_columns[column] = pd.arrays.IntegerArray(values, is_missing[:, position].copy())
+        else:
+            cast_columns[column] = numbers[:, position].astype(dtype)
+    return pd.DataFrame(cast_columns, index=data.index)
+
+def prepare_dataset(schema):
     """
+    Loads the cleaned up version of the World Happiness Report dataset, validates it, casts it to the dtypes of its schema and sorts the values by year in ascending order.
+        Parameters:
+            schema (dict): The schema returned by load_dataset_schema
+
+        Returns:
+            data (DataFrame): DataFrame constructed from the cleaned up version of the World Happiness Report dataset
+    """
+    # The CSV is read without the dtypes of the schema, so that every value can be validated before it is cast to them.
+    # With the explicit dtypes (float32 features, int16 ranks and years, categorical names) the data only needs ~491 KB instead of ~1894 KB
+    # of memory (measured with DataFrame.memory_usage(deep=True)). The values displayed by the dashboard (two decimal places) do not change.
     data = pd.read_csv("./data_cleaned.csv", encoding="UTF-8")
+    numbers = validate_dataset(data, schema)
+    data = cast_dataset(data, numbers, schema)
     # Sort descending by year (Reference: https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.sort_values.html)
     data = data.sort_values(by="year", ascending=True)
     return data
 
+def prepare_dataset_index(data):
+    """
+    Returns the dataset indexed (and sorted) by country name and year so that multiple countries and years can be looked up at once.
+        Parameters:
+            data (DataFrame): DataFrame constructed from the cleaned up version of the World Happiness Report dataset
+
+        Returns:
+            data_index (DataFrame): The same data with a sorted (country_name, year) MultiIndex
+    """
+    # A sorted MultiIndex allows pandas to use a binary search instead of scanning the entire data for every lookup.
+    # See: https://pandas.pydata.org/docs/user_guide/advanced.html#sorting-a-multiindex
+    data_index = data.set_index(["country_name", "year"]).sort_index()
+    # pandas builds the lookup structures of an index lazily on first use. We build them right away so that concurrent callbacks (gthread workers) only ever read them.
+    data_index.index.is_monotonic_increasing
+    data_index.index.get_loc(data_index.index[0])
+    return data_index
+
+def query_countries(selected_countries, from_year, to_year):
+    """
+    Returns the data for multiple countries within a range of years with one single batched lookup
+        Parameters:
+            selected_countries (list): The names of the countries
+            from_year (int): The first year (inclusive)
+            to_year (int): The last year (inclusive)
+
+        Returns:
+            dff (DataFrame): The data of all selected countries within the given years, sorted by country name and year
+    """
+    # Unknown countries would raise a KeyError inside of the lookup
+    known_countries = [country_name for country_name in selected_countries if country_name in df_index.index.levels[0]]
+    dff = df_index.loc[(known_countries, slice(from_year, to_year)), :].reset_index()
+    # The country names are categorical, plotly would otherwise try to draw a line for every other country as well
+    dff["country_name"] = dff["country_name"].cat.remove_unused_categories()
+    return dff
+
+def prepare_biggest_movers(data):
+    """
+    Precalculates the countries which moved up and down the most in the ranking for every year and feature so that they can simply be looked up at runtime
+        Parameters:
+            data (DataFrame): DataFrame constructed from the cleaned up version of the World Happiness Report dataset
+
+        Returns:
+            biggest_movers (dict): A dictionary which associates a (year, feature) tuple with a DataFrame of the biggest movers sorted by their rank delta
+    """
+    biggest_movers = {}
+    for feature in FEATURES_IN_DATA:
+        rank_delta = f"{feature}_rank_delta"
+        # Countries without data for the previous year do not have a rank delta
+        dff = data.dropna(subset=[rank_delta])
+        # Countries which moved by the same number of ranks are ordered by their rank
+        dff = dff.sort_values(by=["year", rank_delta, f"{feature}_rank"], ascending=[True, False, True])
+        dff = pd.concat([dff.groupby("year").head(NUMBER_OF_BIGGEST_MOVERS), dff.groupby("year").tail(NUMBER_OF_BIGGEST_MOVERS)])
+        # In years with only a few countries the top and the bottom could overlap
+        dff = dff[~dff.index.duplicated()]
+        for (year, dff_year) in dff.groupby("year"):
+            biggest_movers[(year, feature)] = dff_year[["country_name", feature, f"{feature}_rank", rank_delta]].sort_values(by=rank_delta, kind="stable")
+    return biggest_movers
+
+def prepare_global_analytics(data):
+    """
+    Precalculates the correlations between the features across all countries and the regression of every feature against Life Ladder
+    for every year and window of years, so that they can simply be looked up at runtime
+        Parameters:
+            data (DataFrame): DataFrame constructed from the cleaned up version of the World Happiness Report dataset
+
+        Returns:
+            global_analytics (dict): A dictionary which associates a (year, window) tuple with the correlation matrix (DataFrame), the regressions (DataFrame with slope, intercept and r_squared per feature) and the number of observations
+            rolling_correlations (dict): A dictionary which associates a window with the correlation of every feature with Life Ladder over the years (DataFrame indexed by year)
+    """
+    # Instead of calling DataFrame.corr for every (year, window) the sums a covariance is made of are calculated once per year for the whole data
+    # and then added up for every window: cov(x, y) = (sum(x * y) - sum(x) * sum(y) / n) / (n - 1)
+    # The features are centered first, which does not change the covariances but keeps the sums small (See: https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance)
+    # Like DataFrame.corr every pair of features only uses the rows in which both are there, so every sum is kept per pair of features:
+    # sums[:, i, j] is the sum of feature i over the rows in which feature j is there as well.
+    features = data[FEATURES_IN_DATA].to_numpy(dtype="float64")
+    is_valid = ~np.isnan(features)
+    feature_means = np.nanmean(features, axis=0)
+    features = np.where(is_valid, features - feature_means, 0)
+    valid = is_valid.astype("float64")
+    years = np.sort(data["year"].unique())
+    year_positions = np.searchsorted(years, data["year"].to_numpy())
+
+    counts = np.zeros((len(years), len(FEATURES_IN_DATA), len(FEATURES_IN_DATA)))
+    np.add.at(counts, year_positions, valid[:, :, None] * valid[:, None, :])
+    sums = np.zeros((len(years), len(FEATURES_IN_DATA), len(FEATURES_IN_DATA)))
+    np.add.at(sums, year_positions, features[:, :, None] * valid[:, None, :])
+    squares = np.zeros((len(years), len(FEATURES_IN_DATA), len(FEATURES_IN_DATA)))
+    np.add.at(squares, year_positions, (features ** 2)[:, :, None] * valid[:, None, :])
+    products = np.zeros((len(years), len(FEATURES_IN_DATA), len(FEATURES_IN_DATA)))
+    np.add.at(products, year_positions, features[:, :, None] * features[:, None, :])
+
+    # With cumulative sums the sums of any window of years are the difference of two entries
+    cumulative_counts, cumulative_sums, cumulative_squares, cumulative_products = [np.concatenate([np.zeros((1, *values.shape[1:])), np.cumsum(values, axis=0)]) for values in (counts, sums, squares, products)]
+
+    life_ladder = FEATURES_IN_DATA.index("life_ladder")
+    regressed_features = [feature for feature in FEATURES_IN_DATA if feature != "life_ladder"]
+    regressed_positions = [FEATURES_IN_DATA.index(feature) for feature in regressed_features]
+
+    global_analytics = {}
+    rolling_correlations = {}
+    for window in GLOBAL_ANALYTICS_WINDOWS:
+        # A window contains the years which are less than window years before the year (years without data are simply missing)
+        starts = np.searchsorted(years, years - window + 1)
+        ends = np.arange(len(years)) + 1
+        n = cumulative_counts[ends] - cumulative_counts[starts]
+        window_sums = cumulative_sums[ends] - cumulative_sums[starts]
+        window_squares = cumulative_squares[ends] - cumulative_squares[starts]
+        window_products = cumulative_products[ends] - cumulative_products[starts]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariances = (window_products - window_sums * np.swapaxes(window_sums, 1, 2) / n) / (n - 1)
+            # The variance of feature i over the rows in which feature j is there as well
+            variances = (window_squares - window_sums ** 2 / n) / (n - 1)
+            correlations = covariances / np.sqrt(variances * np.swapaxes(variances, 1, 2))
+            # Ordinary least squares of Life Ladder against a single feature (See: https://en.wikipedia.org/wiki/Simple_linear_regression)
+            slopes = covariances[:, regressed_positions, life_ladder] / variances[:, regressed_positions, life_ladder]
+            means = window_sums / n + feature_means[None, :, None]
+        intercepts = means[:, life_ladder, regressed_positions] - slopes * means[:, regressed_positions, life_ladder]
+        r_squared = correlations[:, regressed_positions, life_ladder] ** 2
+        # Life Ladder is there in every row, so these are the number of rows in the window
+        number_of_observations = n[:, life_ladder, life_ladder]
+
+        for (position, year) in enumerate(years):
+            correlation = pd.DataFrame(correlations[position], index=FEATURES_IN_DATA, columns=FEATURES_IN_DATA)
+            regression = pd.DataFrame({"feature": regressed_features, "slope": slopes[position], "intercept": intercepts[position], "r_squared": r_squared[position]})
+            global_analytics[(year, window)] = {"correlation": correlation, "regression": regression, "number_of_observations": int(number_of_observations[position])}
+        rolling_correlations[window] = pd.DataFrame(correlations[:, :, life_ladder], index=pd.Index(years, name="year"), columns=FEATURES_IN_DATA).drop(columns="life_ladder")
+    return global_analytics, rolling_correlations
+
+def get_rank_delta_explanation(rank_delta):
+    """
+    Returns a human readable explanation of how the rank of a country changed compared to the previous year
+        Parameters:
+            rank_delta (int): The precalculated rank delta, positive means the country moved up
+
+        Returns:
+            An explanation how many ranks a country moved up or down.
+    """
+    if rank_delta > 0:
+        return f"Moved up {rank_delta:.0f} ranks"
+    if rank_delta < 0:
+        return f"Moved down {-rank_delta:.0f} ranks"
+    return "Same rank"
+
+def decimate_parallel_coordinates(data, dimensions, max_lines):
+    """
+    Returns a stratified sample of the data which still contains the extremes of each dimension
+        Parameters:
+            data (DataFrame): The data which should be displayed in the parallel coordinate system
+            dimensions (list): The features which are displayed as axes
+            max_lines (int): The maximum number of lines (rows) to return
+
+        Returns:
+            sample (DataFrame): The data itself if it has no more than max_lines rows, otherwise a sample of (roughly) max_lines rows
+    """
+    if len(data.index) <= max_lines:
+        return data
+
+    # The rows with the minimum and maximum of each axis are always kept, so the axis ranges stay the same as with the full data
+    extremes = list(set(data[dimensions].idxmin().dropna()) | set(data[dimensions].idxmax().dropna()))
+    rest = data.drop(index=extremes)
+
+    # Stratify by the color (life ladder) so that every part of the color scale is represented proportionally.
+    # A fixed random_state keeps the sample the same between callbacks.
+    strata = pd.qcut(rest["life_ladder"].rank(method="first"), q=PARALLEL_COORDINATES_STRATA, labels=False)
+    fraction = max(max_lines - len(extremes), 0) / len(rest.index)
+    sample = rest.groupby(strata, group_keys=False).sample(frac=fraction, random_state=0)
+    return pd.concat([data.loc[extremes], sample])
+
+def filter_by_constraints(data, constraints):
+    """
+    Returns only the rows which are inside of the brushed ranges of the parallel coordinate system
+        Parameters:
+            data (DataFrame): The data which should be filtered
+            constraints (dict): Associates a feature in the data with a list of [from, to] ranges
+
+        Returns:
+            dff (DataFrame): The rows within at least one range of every constrained feature
+    """
+    mask = pd.Series(True, index=data.index)
+    for (feature, ranges) in constraints.items():
+        if feature in data.columns:
+            mask &= pd.concat([data[feature].between(range_from, range_to) for (range_from, range_to) in ranges], axis=1).any(axis=1)
+    return data[mask]
+
+def generate_parallel_coordinates(data, dimensions, constraints):
+    """
+    Generates the parallel coordinate system, above PARALLEL_COORDINATES_MAX_LINES rows only a sample (or the brushed subset) is sent to the browser
+        Parameters:
+            data (DataFrame): The data of all countries in the selected year
+            dimensions (list): The features which are displayed as axes
+            constraints (dict): The brushed ranges per feature (see filter_by_constraints)
+
+        Returns:
+            parallel_coordinates (Figure): The parallel coordinate system
+            is_decimated (bool): Tells if not all lines are shown
+    """
+    # Implemented with reference to: https://plotly.com/python/parallel-coordinates-plot/
+    constraints = {feature: ranges for (feature, ranges) in constraints.items() if feature in dimensions}
+    dff = data
+    if len(data.index) > PARALLEL_COORDINATES_MAX_LINES and len(constraints) > 0:
+        # Only the brushed subset is fetched in full resolution
+        dff = filter_by_constraints(data, constraints)
+    dff = decimate_parallel_coordinates(dff, dimensions, PARALLEL_COORDINATES_MAX_LINES)
+
+    parallel_coordinates = px.parallel_coordinates(dff, color="life_ladder", dimensions=dimensions, color_continuous_scale=px.colors.sequential.Blues, labels=FEATURES_LABELS)
+
+    # Keep the brushes of the user when the figure is sent again
+    for (index, dimension) in enumerate(dimensions):
+        if dimension in constraints:
+            parallel_coordinates.data[0].dimensions[index].constraintrange = constraints[dimension]
+    return parallel_coordinates, len(dff.index) < len(data.index)
+
+def round_arrays(value, decimals):
+    """
+    Rounds all numeric arrays inside of a (nested) trace dictionary
+        Parameters:
+            value: A trace dictionary or any of its values
+            decimals (int): The number of decimal places to keep
+
+        Returns:
+            The same structure with rounded float arrays (everything else is returned as is)
+    """
+    if isinstance(value, dict):
+        # The geojson of the choropleth map only contains the geometries and is left untouched
+        return {key: item if key == "geojson" else round_arrays(item, decimals) for (key, item) in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [round_arrays(item, decimals) for item in value]
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return value.round(decimals)
+        # e.g customdata which mixes country names and values
+        if value.dtype.kind == "O":
+            return np.array([round(item, decimals) if isinstance(item, float) else item for item in value.ravel()], dtype=object).reshape(value.shape)
+    return value
+
+def compact_figure(fig):
+    """
+    Returns the figure as a dictionary whose data is rounded to FIGURE_PRECISION decimal places, so that the response does not contain values like 50.79999924
+        Parameters:
+            fig (Figure): A plotly figure
+
+        Returns:
+            figure (dict): The figure in the form Dash sends it to the browser
+    """
+    figure = fig.to_plotly_json()
+    figure["data"] = [round_arrays(trace, FIGURE_PRECISION) for trace in figure["data"]]
+    if "frames" in figure:
+        # plotly.js merges the data of an animation frame into the existing traces, so the geojson (which is the same for every frame) only has to be sent once
+        # See: https://plotly.com/javascript/animations/#frame-groups-and-animation-modes
+        for frame in figure["frames"]:
+            frame["data"] = [{key: item for (key, item) in trace.items() if key != "geojson"} for trace in frame.get("data", [])]
+        figure["frames"] = [round_arrays(frame, FIGURE_PRECISION) for frame in figure["frames"]]
+    return figure
+
+def prepare_geojson_url():
+    """
+    Returns the URL of the geojson for the world map, which is served as a fingerprinted asset so that browsers only download it once
+    instead of it being embedded in the layout on every page load
+    """
+    # Geojson was generated with: https://geojson-maps.ash.ms/
+    with open("./custom.geo.json") as f:
+        geo_world = json.load(f)
+    # The map only needs the geometries and the iso code they are matched with (featureidkey), the remaining properties are dropped
+    for feature in geo_world["features"]:
+        feature["properties"] = {"iso_a3": feature["properties"]["iso_a3"]}
+    body = json.dumps(geo_world, separators=(",", ":")).encode("utf-8")
+    return fingerprinted_assets.add("custom.geo.json", body, "application/geo+json")
+
 def generate_world_map():
     """
     Generates a choropleth map in order to display the Life Ladder indicator for all countries over the entire dataset
@@ -135,17 +615,14 @@ def generate_world_map():
     # - https://towardsdatascience.com/how-to-create-outstanding-custom-choropleth-maps-with-plotly-and-dash-49ac918a5f05
     dff = df.copy()
 
-    # Geojson was generated with: https://geojson-maps.ash.ms/
-    with open("./custom.geo.json") as f:
-        geo_world = json.load(f)
-
     hover_data = {"country_name": True, "life_ladder": True, "year": True, "country_code_iso": False}
 
     # We need to map a property inside the geojson to the actual iso code of our country.
     # Luckily this can easily by done via featureidkey, see "Indexing by GeoJSON Properties" on https://plotly.com/python/mapbox-county-choropleth/
     fig = px.choropleth_mapbox(
             dff,
-            geojson=geo_world,
+            # plotly.js loads the geojson from its URL (See: https://plotly.com/python/reference/choroplethmapbox/#choroplethmapbox-geojson)
+            geojson=geojson_url,
             featureidkey="properties.iso_a3",
             mapbox_style="open-street-map", 
             locations="country_code_iso",
@@ -171,20 +648,28 @@ def prepare_layout():
 
     # World Map and associated Country Detail information
     choropleth_map = generate_world_map()
-    world_map = html.Div([html.H4("Life Ladder Overview"), dcc.Graph(figure=choropleth_map)])
-    country_detail = html.Div([html.H5(id="country_detail_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), html.Div(id="country_detail_container", style={"maxHeight": HEIGHT_CHOROPLETH_MAP, "overflowY": "auto"})], className="position-relative", style={"minHeight": HEIGHT_CHOROPLETH_MAP})
+    world_map = html.Div([html.H4("Life Ladder Overview"), dcc.Graph(figure=compact_figure(choropleth_map))])
+    country_detail_height = HEIGHT_CHOROPLETH_MAP - HEIGHT_SIMILAR_COUNTRIES
+    country_detail = html.Div([html.H5(id="country_detail_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), html.Div(id="country_detail_container", style={"maxHeight": country_detail_height, "overflowY": "auto"})], className="position-relative", style={"minHeight": country_detail_height})
+    similar_countries = html.Div([html.H5(id="similar_countries_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), html.Div(id="similar_countries_container", style={"maxHeight": HEIGHT_SIMILAR_COUNTRIES, "overflowY": "auto"})], className="position-relative", style={"minHeight": HEIGHT_SIMILAR_COUNTRIES})
 
     country_detail_section = html.Div([html.H4(id="country_detail_title"), country_detail])
-    world_map_section = dbc.Row([dbc.Col([world_map], className="col-md-8 col-sm-12"), dbc.Col([country_detail_section], className="col-md-4 col-sm-12")], className="my-2")
+    similar_countries_section = html.Div([html.H4(id="similar_countries_title"), similar_countries], className="mt-2")
+    world_map_section = dbc.Row([dbc.Col([world_map], className="col-md-8 col-sm-12"), dbc.Col([country_detail_section, similar_countries_section], className="col-md-4 col-sm-12")], className="my-2")
 
     # Parallel Coordinate System
-    parallel_coordinate_system_section = dbc.Row([html.H4(id="parallel_coordinate_system_title"), dbc.Form([dbc.Label("Select multiple Features", html_for="parallel_coordinate_system_features"), dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="parallel_coordinate_system_features", value=FEATURES_HUMAN_READABLE, multi=True)]),html.Div([html.H5(id="parallel_coordinate_system_overlay", className="justify-content-center align-items-center position-absolute bg-white"), dcc.Graph(id="parallel_coordinate_system")], className="position-relative", style={"minHeight": 250})])
+    parallel_coordinate_system_section = dbc.Row([html.H4(id="parallel_coordinate_system_title"), dbc.Form([dbc.Label("Select multiple Features", html_for="parallel_coordinate_system_features"), dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="parallel_coordinate_system_features", value=FEATURES_HUMAN_READABLE, multi=True)]),html.Div([html.H5(id="parallel_coordinate_system_overlay", className="justify-content-center align-items-center position-absolute bg-white"), dcc.Graph(id="parallel_coordinate_system"), html.P(id="parallel_coordinate_system_info", className="text-muted"), dcc.Store(id="parallel_coordinate_system_constraints", data={})], className="position-relative", style={"minHeight": 250})])
 
     # Top 5 countries bar chart
     top_5_countries_detail = html.Div([html.H5(id="top_5_countries_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), dcc.Graph(id="top_5_countries_bar_chart")], className="position-relative", style={"minHeight": 250}) 
     top_5_countries_feature_dropdown = dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="top_5_countries_feature", value=INITIAL_FIRST_FEATURE, multi=False)
     top_5_countries_section = html.Div([html.H4(id="top_5_countries_title"), dbc.Form([dbc.Label("Select a Feature", html_for="top_5_countries_feature"), top_5_countries_feature_dropdown]), top_5_countries_detail])
 
+    # Biggest movers bar chart
+    biggest_movers_detail = html.Div([html.H5(id="biggest_movers_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), dcc.Graph(id="biggest_movers_bar_chart")], className="position-relative", style={"minHeight": 250})
+    biggest_movers_feature_dropdown = dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="biggest_movers_feature", value=INITIAL_FIRST_FEATURE, multi=False)
+    biggest_movers_section = html.Div([html.H4(id="biggest_movers_title"), dbc.Form([dbc.Label("Select a Feature", html_for="biggest_movers_feature"), biggest_movers_feature_dropdown]), biggest_movers_detail])
+
     # Scatter Plot and in a nutshell explanations
     first_feature_dropdown = dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="first_feature", value=INITIAL_FIRST_FEATURE, multi=False)
     second_feature_dropdown = dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="second_feature", value=INITIAL_SECOND_FEATURE, multi=False)
@@ -198,6 +683,27 @@ def prepare_layout():
     # Heatmap
     heatmap_section = dbc.Row([html.H4(id="correlation_overview_title"), html.Div([html.H5(id="heatmap_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), dcc.Graph(id="heatmap")], className="my-2 position-relative")]) 
 
+    # Correlations and regressions across all countries
+    global_analytics_window_dropdown = dcc.Dropdown(options=[{"label": f"{window} year" if window == 1 else f"{window} years", "value": window} for window in GLOBAL_ANALYTICS_WINDOWS], id="global_analytics_window", value=INITIAL_GLOBAL_ANALYTICS_WINDOW, multi=False, clearable=False)
+    global_analytics_window_div = html.Div([dbc.Label("Select the number of years up to the selected year", html_for="global_analytics_window"), global_analytics_window_dropdown], className="mb-3")
+    global_correlation = html.Div([html.H5("Correlation between the features"), dcc.Graph(id="global_correlation_heatmap")])
+    global_regression = html.Div([html.H5("How well each feature explains Life Ladder"), dcc.Graph(id="global_regression_bar_chart")])
+    rolling_correlation = html.Div([html.H5("Correlation with Life Ladder over time"), dcc.Graph(id="rolling_correlation")])
+    global_analytics_graphs = html.Div([html.H5(id="global_analytics_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), dbc.Row([dbc.Col([global_correlation], className="col-lg-6 col-md-12"), dbc.Col([global_regression], className="col-lg-6 col-md-12")]), rolling_correlation], className="position-relative", style={"minHeight": 250})
+    global_analytics_section = dbc.Row([html.H4(id="global_analytics_title"), dbc.Form([global_analytics_window_div]), global_analytics_graphs], className="my-2")
+
+    # Comparison of multiple countries over a range of years
+    comparison_countries_dropdown = dcc.Dropdown(options=country_names, value=INITIAL_COMPARED_COUNTRIES, id="comparison_countries", multi=True)
+    comparison_countries_div = html.Div([dbc.Label("Select multiple countries", html_for="comparison_countries"), comparison_countries_dropdown], className="mb-3")
+    comparison_years_slider = dcc.RangeSlider(min=country_years[0], max=country_years[-1], step=1, value=[country_years[0], country_years[-1]], marks={year: str(year) for year in country_years}, id="comparison_years")
+    comparison_years_div = html.Div([dbc.Label("Select a range of years", html_for="comparison_years"), comparison_years_slider], className="mb-3")
+    comparison_feature_dropdown = dcc.Dropdown(options=FEATURES_HUMAN_READABLE, id="comparison_feature", value=INITIAL_FIRST_FEATURE, multi=False)
+    comparison_feature_div = html.Div([dbc.Label("Select a Feature", html_for="comparison_feature"), comparison_feature_dropdown], className="mb-3")
+    comparison_trajectory = html.Div([html.H5("Values over time"), dcc.Graph(id="comparison_trajectory")])
+    comparison_ranks = html.Div([html.H5("Ranks over time"), dcc.Graph(id="comparison_ranks")])
+    comparison_graphs = html.Div([html.H5(id="comparison_overlay", className="justify-content-center align-items-center position-absolute bg-white", style=OVERLAY_HIDDEN_STYLE), dbc.Row([dbc.Col([comparison_trajectory], className="col-lg-6 col-md-12"), dbc.Col([comparison_ranks], className="col-lg-6 col-md-12")])], className="position-relative", style={"minHeight": 250})
+    comparison_section = dbc.Row([html.H4(id="comparison_title"), dbc.Form([comparison_countries_div, comparison_years_div, comparison_feature_div]), comparison_graphs], className="my-2")
+
     # Filter
     country_dropdown = dcc.Dropdown(options=country_names, value=INITIAL_COUNTRY_NAME, id='selected_country', multi=False)
     country_div = html.Div([dbc.Label("Select country", html_for="selected_country"), country_dropdown], className="mb-3")
@@ -205,7 +711,7 @@ def prepare_layout():
     year_div= html.Div([dbc.Label("Year", html_for="year"), year_dropdown], className="mb-3")
     floating_filter = dbc.Form([country_div, year_div], className="p-4 border rounded bg-light position-sticky shadow", style={"bottom": "11rem", "width": "36rem", "left": "calc(50vw - 18rem)", "zIndex": Z_INDEX_FILTER})
 
-    return html.Div([app_header, world_map_section, parallel_coordinate_system_section, top_5_countries_section, scatter_plot_section, heatmap_section, floating_filter], className="p-4")
+    return html.Div([app_header, world_map_section, parallel_coordinate_system_section, top_5_countries_section, biggest_movers_section, scatter_plot_section, heatmap_section, global_analytics_section, comparison_section, floating_filter], className="p-4")
 
 def generate_country_card(feature_human_readable, feature, df_country):
     """
@@ -225,11 +731,55 @@ def generate_country_card(feature_human_readable, feature, df_country):
     total_number_of_ranks = df_country["total_number_of_ranks"].values[0]
     value = df_country[feature].values[0]
 
+    # The deltas to the previous year are precalculated during the data cleaning, a missing value means that there is no data for the previous year.
+    rank_delta = df_country[f"{feature}_rank_delta"].values[0]
+    value_delta = df_country[f"{feature}_delta"].values[0]
+    if pd.isna(rank_delta):
+        delta = html.P("No data for the previous year", className="text-muted mb-0")
+    else:
+        delta = html.P(f"{get_rank_delta_explanation(rank_delta)} compared to the previous year (Value: {value_delta:+4.2f})", className="text-muted mb-0")
+
     # The entire value is quite verbose. In order to improve readability we only show the value with a precision of two after the decimal point.
     # See: https://stackoverflow.com/questions/8885663/how-to-format-a-floating-number-to-fixed-width-in-python
-    card = dbc.Card(dbc.CardBody([html.H5(feature_human_readable, className="card-title"), html.P(ranking_explanation, className="card-subtitle mb-2 text-muted"), html.P(feature_explanation), html.H3(dbc.Badge(f"Ranked {rank}", color="primary", className="p-2")), html.P(f"out of {total_number_of_ranks}", className="text-muted"), html.B(f"Value: {value:4.2f}")]), className="my-2")
+    # Missing values are only interpolated within a country, so there are countries without a value (and therefore without a rank) for a feature
+    if pd.isna(value):
+        card = dbc.Card(dbc.CardBody([html.H5(feature_human_readable, className="card-title"), html.P(ranking_explanation, className="card-subtitle mb-2 text-muted"), html.P(feature_explanation), html.H3(dbc.Badge("Not ranked", color="secondary", className="p-2")), html.P(f"No data for {feature_human_readable} in this year", className="text-muted mb-0")]), className="my-2")
+        return card
+    card = dbc.Card(dbc.CardBody([html.H5(feature_human_readable, className="card-title"), html.P(ranking_explanation, className="card-subtitle mb-2 text-muted"), html.P(feature_explanation), html.H3(dbc.Badge(f"Ranked {rank}", color="primary", className="p-2")), html.P(f"out of {total_number_of_ranks}", className="text-muted"), html.B(f"Value: {value:4.2f}"), delta]), className="my-2")
     return card
 
+def get_similar_countries(country_year):
+    """
+    Returns the precalculated similar countries of a country in a certain year together with their distance
+        Parameters:
+            country_year (Series): The row of the country in that year
+
+        Returns:
+            similar_countries (list): A list of (country name, distance) tuples, the most similar country first
+    """
+    similar_countries = []
+    number = 1
+    # The number of similar countries is decided by data_cleaning.py, a year with only a few countries can have less of them
+    while f"similar_country_{number}" in country_year.index:
+        country_name = country_year[f"similar_country_{number}"]
+        if not pd.isna(country_name):
+            similar_countries.append((country_name, country_year[f"similar_country_{number}_distance"]))
+        number += 1
+    return similar_countries
+
+def generate_similar_countries_list(similar_countries):
+    """
+    Returns a bootstrap ListGroup with one item for each similar country
+        Parameters:
+            similar_countries (list): A list of (country name, distance) tuples as returned by get_similar_countries
+
+        Returns:
+            list_group (dbc.ListGroup): A bootstrap ListGroup showing the similar countries with their distance
+    """
+    # Implemented with reference to: https://dash-bootstrap-components.opensource.faculty.ai/docs/components/list_group/
+    items = [dbc.ListGroupItem([html.Span(country_name), dbc.Badge(f"Distance {distance:4.2f}", color="primary", className="p-2")], className="d-flex justify-content-between align-items-center") for (country_name, distance) in similar_countries]
+    return dbc.ListGroup(items)
+
 def get_correlation_category(corr_factor):
     """
     Returns a correlation category (negligible, weak, moderate, strong, very strong) and if it is positive or not.
@@ -294,10 +844,18 @@ def get_simplified_correlation_explanation(corr_factor, first_feature, second_fe
     return f"The Correlation is very strong: The higher {first_feature} the lower is {second_feature} in {country_name}"
 
 # Load Dataset and initial layout
-df = prepare_dataset()
+dataset_schema = load_dataset_schema("./data_cleaned.schema.json", "./data_cleaned.csv")
+# Caches (e.g of the background callbacks) are keyed on the version, so they never return results of another dataset
+dataset_version = dataset_schema["version"]
+df = prepare_dataset(dataset_schema)
+df_index = prepare_dataset_index(df)
+biggest_movers = prepare_biggest_movers(df)
+global_analytics, rolling_correlations = prepare_global_analytics(df)
 country_names = get_country_names(df)
 country_years = get_country_years(df)
+geojson_url = prepare_geojson_url()
 app.layout = prepare_layout()
+app.serialize_layout()
 
 @app.callback(Output("country_detail_overlay", "children"), Output("country_detail_overlay", "style"), Output("country_detail_title", "children"), Output("country_detail_container", "children"), Input("selected_country", "value"), Input("year", "value"))
 def update_country_detail(selected_country, year):
@@ -319,6 +877,26 @@ def update_country_detail(selected_country, year):
     return "", OVERLAY_HIDDEN_STYLE, country_detail_title, country_detail 
 
 
+@app.callback(Output("similar_countries_overlay", "children"), Output("similar_countries_overlay", "style"), Output("similar_countries_title", "children"), Output("similar_countries_container", "children"), Input("selected_country", "value"), Input("year", "value"))
+def update_similar_countries(selected_country, year):
+    similar_countries_title = "Similar Countries"
+    if selected_country == None or year == None:
+        return "No country or year selected", OVERLAY_SHOWN_STYLE, similar_countries_title, []
+
+    # The nearest neighbours of every country and year are searched during the data cleaning (see precalculate_similar_countries in data_cleaning.py),
+    # so this is a single lookup in the index which takes well below a millisecond.
+    key = (selected_country, int(year))
+    if key not in df_index.index:
+        return f"No data found for {selected_country} in Year {year}", OVERLAY_SHOWN_STYLE, similar_countries_title, []
+
+    similar_countries = get_similar_countries(df_index.loc[key])
+    if len(similar_countries) == 0:
+        return f"No similar countries found for {selected_country} in Year {year}", OVERLAY_SHOWN_STYLE, similar_countries_title, []
+
+    explanation = html.P(f"The countries whose features were the closest to the ones of {selected_country} in {year}. Every feature is compared relative to all countries of that year, a smaller distance means more similar.", className="text-muted")
+    similar_countries_title = f"Countries similar to {selected_country} in Year {year}"
+    return "", OVERLAY_HIDDEN_STYLE, similar_countries_title, [explanation, generate_similar_countries_list(similar_countries)]
+
 @app.callback(Output("top_5_countries_title", "children"), Output("top_5_countries_overlay", "children"), Output("top_5_countries_overlay", "style"), Output("top_5_countries_bar_chart", "figure"), Input("year", "value"), Input("top_5_countries_feature", "value"))
 def update_top_5_countries(year, feature):
     title = "Top 5 Countries"
@@ -337,28 +915,82 @@ def update_top_5_countries(year, feature):
     dff = dff[dff["year"] == int(year)]
 
     # Then sort by the desired feature (e.g life ladder) and take the first 5.
-    dff = dff.sort_values(by=feature_data, ascending=False)
+    # The precalculated rank is based on the full precision values, so it also orders countries whose (float32) values are equal.
+    dff = dff.sort_values(by=f"{feature_data}_rank", ascending=True)
     dff_top_5 = dff.head(5)
-    return title, "", OVERLAY_HIDDEN_STYLE, px.bar(dff_top_5, x=feature_data, y="country_name", orientation="h", labels=FEATURES_LABELS)
+    return title, "", OVERLAY_HIDDEN_STYLE, compact_figure(px.bar(dff_top_5, x=feature_data, y="country_name", orientation="h", labels=FEATURES_LABELS))
 
-@app.callback(Output("parallel_coordinate_system_title", "children"), Output("parallel_coordinate_system_overlay", "children"), Output("parallel_coordinate_system_overlay", "style"), Output("parallel_coordinate_system", "figure"), Input("year", "value"), Input("parallel_coordinate_system_features", "value"))
-def update_parallel_coordinate_system(year, features_human_readable):
-    # Implemented with reference to: https://plotly.com/python/parallel-coordinates-plot/
+@app.callback(Output("biggest_movers_title", "children"), Output("biggest_movers_overlay", "children"), Output("biggest_movers_overlay", "style"), Output("biggest_movers_bar_chart", "figure"), Input("year", "value"), Input("biggest_movers_feature", "value"))
+def update_biggest_movers(year, feature):
+    title = "Biggest Movers"
+    if year == None:
+        return title, "No Year selected", OVERLAY_SHOWN_STYLE, px.bar()
+
+    feature_data = FEATURES_DICT.get(feature, None)
+
+    if feature_data == None:
+        return title, "Please select a feature", OVERLAY_SHOWN_STYLE, px.bar()
+
+    # The biggest movers are precalculated, so all we have to do is a lookup
+    dff_movers = biggest_movers.get((int(year), feature_data), None)
+    if dff_movers is None:
+        return title, f"No data of the previous year to compare {year} with", OVERLAY_SHOWN_STYLE, px.bar()
+
+    title = f"Biggest Movers in the Ranking for {feature} in Year {year}"
+    rank_delta = f"{feature_data}_rank_delta"
+    labels = {**FEATURES_LABELS, rank_delta: "Ranks moved compared to the previous year", f"{feature_data}_rank": "Rank"}
+    bar_chart = px.bar(dff_movers, x=rank_delta, y="country_name", orientation="h", color=rank_delta, color_continuous_scale=px.colors.diverging.RdBu, color_continuous_midpoint=0, hover_data=[feature_data, f"{feature_data}_rank"], labels=labels)
+    return title, "", OVERLAY_HIDDEN_STYLE, compact_figure(bar_chart)
+
+@app.callback(Output("parallel_coordinate_system_constraints", "data"), Input("parallel_coordinate_system", "restyleData"), Input("year", "value"), Input("parallel_coordinate_system_features", "value"), State("parallel_coordinate_system_constraints", "data"))
+def update_parallel_coordinate_system_constraints(restyle_data, year, features_human_readable, constraints):
+    # A different year or different features start without any brushes
+    if ctx.triggered_id != "parallel_coordinate_system" or restyle_data == None or features_human_readable == None:
+        return {} if constraints else no_update
+
+    # All lines of the year are already in the browser, which filters them by itself, so there is no need to generate the chart again
+    if year == None or len(query_year(int(year)).index) <= PARALLEL_COORDINATES_MAX_LINES:
+        return no_update
+
+    # Brushing an axis results in something like [{"dimensions[0].constraintrange": [[0.1, 0.5]]}, [0]]
+    # See: https://plotly.com/javascript/plotlyjs-events/#event-data
+    dimensions = [FEATURES_DICT.get(feature_human_readable, "") for feature_human_readable in features_human_readable]
+    constraints = dict(constraints or {})
+    for (key, ranges) in restyle_data[0].items():
+        if not (key.startswith("dimensions[") and key.endswith("].constraintrange")):
+            continue
+        index = int(key[len("dimensions["):-len("].constraintrange")])
+        if index >= len(dimensions):
+            continue
+        # Plotly wraps the value in a list, a single range is [from, to] and multiple ranges are [[from, to], ...]
+        ranges = ranges[0] if isinstance(ranges, list) and len(ranges) == 1 else ranges
+        if ranges == None or len(ranges) == 0:
+            constraints.pop(dimensions[index], None)
+        else:
+            constraints[dimensions[index]] = ranges if isinstance(ranges[0], list) else [ranges]
+    return constraints
+
+@app.callback(Output("parallel_coordinate_system_title", "children"), Output("parallel_coordinate_system_overlay", "children"), Output("parallel_coordinate_system_overlay", "style"), Output("parallel_coordinate_system", "figure"), Output("parallel_coordinate_system_info", "children"), Input("year", "value"), Input("parallel_coordinate_system_features", "value"), Input("parallel_coordinate_system_constraints", "data"), background=True, interval=BACKGROUND_CALLBACK_INTERVAL, running=[(Output("parallel_coordinate_system_overlay", "children"), "Loading...", ""), (Output("parallel_coordinate_system_overlay", "style"), OVERLAY_SHOWN_STYLE, OVERLAY_HIDDEN_STYLE)])
+def update_parallel_coordinate_system(year, features_human_readable, constraints):
     title = f"Compare Features across all Countries"
 
     if year == None:
-        return title, f"No Year selected", OVERLAY_SHOWN_STYLE, px.parallel_coordinates(pd.DataFrame())
+        return title, f"No Year selected", OVERLAY_SHOWN_STYLE, px.parallel_coordinates(pd.DataFrame()), ""
 
     if features_human_readable == None or len(features_human_readable) < 2:
-        return title, f"Please select at least two features", OVERLAY_SHOWN_STYLE, px.parallel_coordinates(pd.DataFrame())
+        return title, f"Please select at least two features", OVERLAY_SHOWN_STYLE, px.parallel_coordinates(pd.DataFrame()), ""
 
     dff = df.copy()
     dff = dff[dff["year"] == int(year)]
     title =  f"Compare Features across all Countries in Year {year}"
     dimensions = [FEATURES_DICT.get(feature_human_readable, "") for feature_human_readable in features_human_readable]
-    parallel_coordinates = px.parallel_coordinates(dff, color="life_ladder", dimensions=dimensions, color_continuous_scale=px.colors.sequential.Blues, labels=FEATURES_LABELS)
+    parallel_coordinates, is_decimated = generate_parallel_coordinates(dff, dimensions, constraints or {})
+
+    info = ""
+    if is_decimated:
+        info = f"Showing a sample of at most {PARALLEL_COORDINATES_MAX_LINES} out of {len(dff.index)} lines. Brush an axis to see all lines within the selected range."
 
-    return title, "", OVERLAY_HIDDEN_STYLE, parallel_coordinates
+    return title, "", OVERLAY_HIDDEN_STYLE, compact_figure(parallel_coordinates), info
 
 @app.callback(Output("simplified_explanation_overlay", "children"), Output("simplified_explanation_overlay", "style"), Output("simplified_explanation_container", "children"), Input("selected_country", "value"), Input("first_feature", "value"), Input("second_feature", "value"))
 def udpate_simplified_explanation_detail(selected_country, first_feature, second_feature):
@@ -383,6 +1015,9 @@ def udpate_simplified_explanation_detail(selected_country, first_feature, second
         return f"Insufficient number of data in order to caluclate a meaningful correlation", OVERLAY_SHOWN_STYLE, []
 
     corr_value = dff_country[first_feature_data].corr(dff_country[second_feature_data])
+    # Countries without (enough) values for one of the features have no correlation
+    if pd.isna(corr_value):
+        return f"Insufficient number of data in order to caluclate a meaningful correlation", OVERLAY_SHOWN_STYLE, []
     simplified_explanation = get_simplified_correlation_explanation(corr_value, first_feature, second_feature, selected_country)
     simplified_card = dbc.Card(dbc.CardBody([html.H6(simplified_explanation)]), className="p-2 my-3")
 
@@ -438,9 +1073,62 @@ def update_heatmap(selected_country):
     heatmap = px.imshow(correlation, x=columns, y=columns, aspect="auto", text_auto=True, color_continuous_scale=px.colors.sequential.Blues, labels=FEATURES_LABELS)
     heatmap.update_xaxes(side="top")
     heatmap_title = f"Correlation Information about {selected_country}"
-    return "", OVERLAY_HIDDEN_STYLE, heatmap_title, heatmap 
+    return "", OVERLAY_HIDDEN_STYLE, heatmap_title, compact_figure(heatmap)
+
+@app.callback(Output("global_analytics_overlay", "children"), Output("global_analytics_overlay", "style"), Output("global_analytics_title", "children"), Output("global_correlation_heatmap", "figure"), Output("global_regression_bar_chart", "figure"), Output("rolling_correlation", "figure"), Input("year", "value"), Input("global_analytics_window", "value"))
+def update_global_analytics(year, window):
+    global_analytics_title = "Correlation Information across all Countries"
+    if year == None:
+        return "No year selected", OVERLAY_SHOWN_STYLE, global_analytics_title, px.imshow(pd.DataFrame()), px.bar(), px.line()
+
+    # Everything is precalculated for every year and window (see prepare_global_analytics), so this is only a lookup
+    analytics = global_analytics.get((int(year), window), None)
+    if analytics == None:
+        return f"No data found for Year {year}", OVERLAY_SHOWN_STYLE, global_analytics_title, px.imshow(pd.DataFrame()), px.bar(), px.line()
+
+    from_year = int(year) - window + 1
+    years = f"Year {year}" if window == 1 else f"Years {from_year} to {year}"
+    if analytics["number_of_observations"] <= 2:
+        return f"Insufficient number of data in {years} in order to calculate a meaningful correlation", OVERLAY_SHOWN_STYLE, global_analytics_title, px.imshow(pd.DataFrame()), px.bar(), px.line()
+
+    heatmap, regression_bar_chart, rolling_correlation_chart = generate_global_analytics_figures(int(year), window)
+    global_analytics_title = f"Correlation Information across all Countries for {years} ({analytics['number_of_observations']} Observations)"
+    return "", OVERLAY_HIDDEN_STYLE, global_analytics_title, heatmap, regression_bar_chart, rolling_correlation_chart
+
+# Creating the plotly figures takes ~150ms, while looking up the analytics takes a few microseconds. There is only a small number of (year, window)
+# combinations, so every worker creates the figures of a combination once and afterwards simply looks them up as well.
+@functools.lru_cache(maxsize=None)
+def generate_global_analytics_figures(year, window):
+    """
+    Returns the figures of the global analytics view for a year and window
+        Parameters:
+            year (int): The last year of the window
+            window (int): The number of years up to and including the year
 
-@app.callback(Output("scatter_plot_overlay", "children"), Output("scatter_plot_overlay", "style"), Output("features_title", "children"), Output("scatter_plot", "figure"), Input("selected_country", "value"), Input("first_feature", "value"), Input("second_feature", "value"))
+        Returns:
+            heatmap (dict): The correlation between the features across all countries
+            regression_bar_chart (dict): The coefficient of determination of the regression of Life Ladder against each feature
+            rolling_correlation_chart (dict): The correlation of each feature with Life Ladder over all years, for the same window
+    """
+    analytics = global_analytics[(year, window)]
+
+    # Implemented with reference to: https://plotly.com/python/heatmaps/
+    heatmap = px.imshow(analytics["correlation"].round(2), x=FEATURES_HUMAN_READABLE, y=FEATURES_HUMAN_READABLE, aspect="auto", text_auto=True, color_continuous_scale=px.colors.sequential.Blues, labels=FEATURES_LABELS)
+    heatmap.update_xaxes(side="top")
+
+    # The coefficient of determination tells how much of the variation of Life Ladder is explained by a feature alone, the slope in which direction
+    regression = analytics["regression"]
+    labels = {**FEATURES_LABELS, "feature": "Feature", "r_squared": "Coefficient of Determination (R²)", "slope": "Slope", "intercept": "Intercept"}
+    regression_bar_chart = px.bar(regression.assign(feature=regression["feature"].map(FEATURES_LABELS)), x="feature", y="r_squared", hover_data={"slope": ":.3f", "intercept": ":.3f", "r_squared": ":.2f"}, labels=labels, range_y=[0, 1])
+
+    # Implemented with reference to: https://plotly.com/python/line-charts/
+    rolling = rolling_correlations[window].rename(columns=FEATURES_LABELS)
+    rolling_correlation_chart = px.line(rolling, markers=True, labels={"year": "Year", "value": "Correlation with Life Ladder", "variable": "Feature"}, range_y=[-1, 1])
+    rolling_correlation_chart.add_vline(x=year, line_dash="dash", line_color="gray")
+
+    return compact_figure(heatmap), compact_figure(regression_bar_chart), compact_figure(rolling_correlation_chart)
+
+@app.callback(Output("scatter_plot_overlay", "children"), Output("scatter_plot_overlay", "style"), Output("features_title", "children"), Output("scatter_plot", "figure"), Input("selected_country", "value"), Input("first_feature", "value"), Input("second_feature", "value"), background=True, interval=BACKGROUND_CALLBACK_INTERVAL, running=[(Output("scatter_plot_overlay", "children"), "Loading...", ""), (Output("scatter_plot_overlay", "style"), OVERLAY_SHOWN_STYLE, OVERLAY_HIDDEN_STYLE)])
 def update_scatter_plot(selected_country, first_feature, second_feature):
     scatter_title = f"Comparing Features"
     if selected_country == None:
@@ -463,7 +1151,225 @@ def update_scatter_plot(selected_country, first_feature, second_feature):
     scatter_plot = px.scatter(dff_country, x=first_feature_data, y=second_feature_data, text="year", trendline="ols", labels=FEATURES_LABELS)
     scatter_plot.update_traces(textposition='top center')
     scatter_title = f"Comparing {first_feature} and {second_feature} for {selected_country}"
-    return "", OVERLAY_HIDDEN_STYLE, scatter_title, scatter_plot
+    return "", OVERLAY_HIDDEN_STYLE, scatter_title, compact_figure(scatter_plot)
+
+def generate_comparison_figure(dff, feature, labels, hover_data=[]):
+    """
+    Returns a line chart of a feature over the years with a line per country, drawn by a fixed number of traces
+        Parameters:
+            dff (DataFrame): The data of the countries sorted by country name and year (as returned by query_countries)
+            feature (str): The column to draw (e.g life_ladder or life_ladder_rank)
+            labels (dict): The human readable names of the columns
+            hover_data (list): Further columns which are shown when hovering a point
+
+        Returns:
+            figure (Figure): The line chart
+    """
+    # A trace per country (like px.line with color) makes the figure slower with every selected country (~1s for 160 countries).
+    # Instead there is one trace per color of the palette, the lines of all countries sharing a color are separated by missing values,
+    # so there are never more than 10 traces no matter how many countries are selected.
+    # Implemented with reference to: https://plotly.com/python/line-charts/ and https://plotly.com/python/hover-text-and-formatting/#customizing-hover-text-with-a-hovertemplate
+    palette = px.colors.qualitative.Plotly
+    country_codes = dff["country_name"].cat.codes.to_numpy()
+    # Missing values (e.g the ranks of a country without a value) are NaN as well and leave a gap in the line
+    values = dff[feature].to_numpy(dtype="float64", na_value=np.nan)
+    years = dff["year"].to_numpy(dtype="float64")
+    hover_values = dff[["country_name", *hover_data]].to_numpy(dtype=object)
+    hovertemplate = "<br>".join(["%{customdata[0]}", f"{labels['year']}: %{{x}}", f"{labels[feature]}: %{{y}}", *[f"{labels[column]}: %{{customdata[{position + 1}]}}" for (position, column) in enumerate(hover_data)]])
+
+    figure = go.Figure()
+    for (color_index, color) in enumerate(palette):
+        positions = np.flatnonzero(country_codes % len(palette) == color_index)
+        if len(positions) == 0:
+            continue
+        boundaries = np.flatnonzero(np.diff(country_codes[positions])) + 1
+        figure.add_scatter(x=np.insert(years[positions], boundaries, np.nan), y=np.insert(values[positions], boundaries, np.nan), customdata=np.insert(hover_values[positions], boundaries, None, axis=0), mode="lines+markers", line={"color": color}, hovertemplate=hovertemplate + "<extra></extra>")
+
+    # Instead of a legend the last point of every country is labelled with its name (one more trace for all countries)
+    last_positions = np.append(np.flatnonzero(np.diff(country_codes)), len(country_codes) - 1)
+    label_colors = [palette[code % len(palette)] for code in country_codes[last_positions]]
+    figure.add_scatter(x=years[last_positions], y=values[last_positions], text=dff["country_name"].to_numpy()[last_positions], mode="text", textposition="middle right", textfont={"color": label_colors}, cliponaxis=False, hoverinfo="skip")
+    figure.update_layout(xaxis_title=labels["year"], yaxis_title=labels[feature], showlegend=False, margin={"r": 120})
+    return figure
+
+@app.callback(Output("comparison_overlay", "children"), Output("comparison_overlay", "style"), Output("comparison_title", "children"), Output("comparison_trajectory", "figure"), Output("comparison_ranks", "figure"), Input("comparison_countries", "value"), Input("comparison_years", "value"), Input("comparison_feature", "value"))
+def update_comparison(selected_countries, years, feature):
+    comparison_title = "Compare Countries over Time"
+    if selected_countries == None or len(selected_countries) == 0:
+        return "No countries selected", OVERLAY_SHOWN_STYLE, comparison_title, px.line(), px.line()
+
+    feature_data = FEATURES_DICT.get(feature, None)
+    if feature_data == None:
+        return "Please select a feature", OVERLAY_SHOWN_STYLE, comparison_title, px.line(), px.line()
+
+    from_year, to_year = years
+    # All selected countries are fetched with one single lookup, so the cost stays the same no matter how many countries are selected.
+    dff = query_countries(selected_countries, from_year, to_year)
+    if dff.empty:
+        return f"No data found for the selected countries between {from_year} and {to_year}", OVERLAY_SHOWN_STYLE, comparison_title, px.line(), px.line()
+
+    labels = {**FEATURES_LABELS, "year": "Year", f"{feature_data}_rank": f"Rank ({feature})", "total_number_of_ranks": "Number of Ranks"}
+    trajectory = generate_comparison_figure(dff, feature_data, labels)
+    ranks = generate_comparison_figure(dff, f"{feature_data}_rank", labels, hover_data=["total_number_of_ranks"])
+    # Rank 1 is the best rank, therefore it should be displayed on top
+    ranks.update_yaxes(autorange="reversed")
+
+    comparison_title = f"Compare {feature} from {from_year} to {to_year}"
+    return "", OVERLAY_HIDDEN_STYLE, comparison_title, compact_figure(trajectory), compact_figure(ranks)
+
+def query_year(year):
+    """
+    Returns the data of all countries in a year
+        Parameters:
+            year (int): The year
+
+        Returns:
+            dff (DataFrame): A slice of the dataset, which is sorted by year, so the rows do not have to be filtered (and copied)
+    """
+    start, end = np.searchsorted(df["year"].to_numpy(), [year, year + 1])
+    return df.iloc[start:end]
+
+def get_export_argument(name, convert=str):
+    """
+    Returns a query parameter of an export request or aborts the request with 400 Bad Request if it is missing or invalid
+        Parameters:
+            name (str): The name of the query parameter
+            convert (function): Converts the value (e.g int)
+
+        Returns:
+            value: The converted value
+    """
+    value = flask.request.args.get(name, None)
+    if value == None:
+        flask.abort(400, f"The parameter {name} is missing")
+    try:
+        return convert(value)
+    except ValueError:
+        flask.abort(400, f"The parameter {name} is invalid")
+
+def get_export_feature(name):
+    feature = get_export_argument(name)
+    if feature not in FEATURES_DICT:
+        flask.abort(400, f"The parameter {name} has to be one of: {', '.join(FEATURES_HUMAN_READABLE)}")
+    return feature
+
+def get_export_window():
+    window = get_export_argument("window", int)
+    if window not in GLOBAL_ANALYTICS_WINDOWS:
+        flask.abort(400, f"The parameter window has to be one of: {', '.join(str(window) for window in GLOBAL_ANALYTICS_WINDOWS)}")
+    return window
+
+def get_export_countries():
+    # The comparison takes the parameter multiple times (e.g ?country=Switzerland&country=Germany)
+    countries = flask.request.args.getlist("country")
+    if len(countries) == 0:
+        flask.abort(400, "The parameter country is missing")
+    return countries
+
+def export_country():
+    country_name = get_export_argument("country")
+    if country_name not in df_index.index.levels[0]:
+        flask.abort(404, f"No data found for {country_name}")
+    # All years of a country are a single lookup in the sorted index
+    return df_index.loc[[country_name]].reset_index()
+
+def export_year():
+    dff = query_year(get_export_argument("year", int))
+    if dff.empty:
+        flask.abort(404, "No data found for this year")
+    return dff
+
+def export_top():
+    dff = query_year(get_export_argument("year", int))
+    feature = FEATURES_DICT[get_export_feature("feature")]
+    # Without the parameter the export contains the same countries as the top 5 countries chart
+    number_of_countries = get_export_argument("n", int) if "n" in flask.request.args else 5
+    if number_of_countries < 1:
+        flask.abort(400, "The parameter n has to be at least 1")
+    if dff.empty:
+        flask.abort(404, "No data found for this year")
+    return dff.nsmallest(number_of_countries, f"{feature}_rank")
+
+def rename_correlation(correlation):
+    return correlation.rename(index=FEATURES_LABELS, columns=FEATURES_LABELS).rename_axis("feature").reset_index()
+
+def export_country_correlation():
+    # The correlation within a country (like the heatmap)
+    country_name = get_export_argument("country")
+    if country_name not in df_index.index.levels[0]:
+        flask.abort(404, f"No data found for {country_name}")
+    dff_country = df_index.loc[country_name, FEATURES_IN_DATA]
+    if len(dff_country.index) <= 1:
+        flask.abort(404, "Insufficient number of data in order to calculate a meaningful correlation")
+    return rename_correlation(dff_country.corr())
+
+def export_global_correlation():
+    # The correlation across all countries (like the global analytics)
+    analytics = global_analytics.get((get_export_argument("year", int), get_export_window()), None)
+    if analytics == None:
+        flask.abort(404, "No data found for this year")
+    return rename_correlation(analytics["correlation"])
+
+# The data which can be exported with the query parameters it reads (e.g /export/top.csv?year=2020&feature=Life Ladder&n=10)
+DATA_EXPORTS = {
+        "country": (["country"], export_country),
+        "year": (["year"], export_year),
+        "top": (["year", "feature", "n"], export_top),
+        "country_correlation": (["country"], export_country_correlation),
+        "global_correlation": (["year", "window"], export_global_correlation)
+        }
+
+# The figures which can be exported as images with the query parameters they read. The parameters are validated up front (400 Bad Request),
+# the figures are then created by their callbacks and each function returns the overlay message (empty if there is data) and the figure.
+FIGURE_EXPORTS = {
+        "top_5_countries": (["year", "feature"], lambda: itemgetter(1, 3)(update_top_5_countries(get_export_argument("year", int), get_export_feature("feature")))),
+        "biggest_movers": (["year", "feature"], lambda: itemgetter(1, 3)(update_biggest_movers(get_export_argument("year", int), get_export_feature("feature")))),
+        "parallel_coordinate_system": (["year"], lambda: itemgetter(1, 3)(update_parallel_coordinate_system(get_export_argument("year", int), FEATURES_HUMAN_READABLE, {}))),
+        "heatmap": (["country"], lambda: itemgetter(0, 3)(update_heatmap(get_export_argument("country")))),
+        "scatter_plot": (["country", "first_feature", "second_feature"], lambda: itemgetter(0, 3)(update_scatter_plot(get_export_argument("country"), get_export_feature("first_feature"), get_export_feature("second_feature")))),
+        "global_correlation": (["year", "window"], lambda: itemgetter(0, 3)(update_global_analytics(get_export_argument("year", int), get_export_window()))),
+        "global_regression": (["year", "window"], lambda: itemgetter(0, 4)(update_global_analytics(get_export_argument("year", int), get_export_window()))),
+        "rolling_correlation": (["year", "window"], lambda: itemgetter(0, 5)(update_global_analytics(get_export_argument("year", int), get_export_window()))),
+        "comparison_trajectory": (["country", "from_year", "to_year", "feature"], lambda: itemgetter(0, 3)(update_comparison(get_export_countries(), [get_export_argument("from_year", int), get_export_argument("to_year", int)], get_export_feature("feature")))),
+        "comparison_ranks": (["country", "from_year", "to_year", "feature"], lambda: itemgetter(0, 4)(update_comparison(get_export_countries(), [get_export_argument("from_year", int), get_export_argument("to_year", int)], get_export_feature("feature"))))
+        }
+
+def get_export_parameters(parameters):
+    # Only the parameters the view reads, so that unknown parameters do not end up in the cache key or the filename.
+    # Parameters which are given multiple times (e.g country for the comparison) keep their order.
+    return [(parameter, flask.request.args.getlist(parameter)) for parameter in parameters]
+
+def get_export_key(name, parameters, file_format):
+    return (name, tuple((parameter, tuple(values)) for (parameter, values) in get_export_parameters(parameters)), file_format)
+
+def get_export_filename(name, parameters, file_format):
+    # The parameters become part of the name (e.g top-2020-Life_Ladder-10.csv), everything except letters and digits is replaced so that the header stays valid
+    parts = [name, *[value for (_, values) in get_export_parameters(parameters) for value in values]]
+    return "-".join("".join(character if character.isascii() and character.isalnum() else "_" for character in part) for part in parts) + f".{file_format}"
+
+@server.route(f"{app.config.routes_pathname_prefix}export/<name>.<file_format>")
+def export_data(name, file_format):
+    if name not in DATA_EXPORTS or file_format not in DATA_EXPORT_FORMATS:
+        flask.abort(404)
+    parameters, export = DATA_EXPORTS[name]
+    # The lookup only selects the rows (no copy of the dataset), they are converted to the file format chunk by chunk
+    dff = export()
+    generate_chunks = (lambda: csv_chunks(dff)) if file_format == "csv" else (lambda: parquet_chunks(dff))
+    return export_cache.response(get_export_key(name, parameters, file_format), get_export_filename(name, parameters, file_format), file_format, generate_chunks)
+
+@server.route(f"{app.config.routes_pathname_prefix}export/figure/<name>.<file_format>")
+def export_figure(name, file_format):
+    if name not in FIGURE_EXPORTS or file_format not in IMAGE_EXPORT_FORMATS:
+        flask.abort(404)
+    parameters, export = FIGURE_EXPORTS[name]
+    def generate_chunks():
+        # Invalid parameters were already rejected, so the remaining messages mean that there is no (or not enough) data
+        message, figure = export()
+        if message != "":
+            flask.abort(404, message)
+        # Static images are rendered with kaleido (See: https://plotly.com/python/static-image-export/)
+        return [pio.to_image(figure, format=file_format, width=EXPORT_IMAGE_WIDTH, height=EXPORT_IMAGE_HEIGHT)]
+    return export_cache.response(get_export_key(name, parameters, file_format), get_export_filename(name, parameters, file_format), file_format, generate_chunks)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
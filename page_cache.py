@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+
+import flask
+from dash import Dash
+from dash._utils import to_json
+
+# Fingerprinted assets change their URL whenever their content changes, so browsers can keep them for a year without asking again
+FINGERPRINTED_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# The layout keeps its URL, so browsers have to revalidate it on every page load (which is answered with 304 Not Modified if it did not change)
+REVALIDATED_CACHE_CONTROL = "no-cache"
+
+
+class PrecompressedBody:
+    """
+    Response body which is encoded and compressed once and then served from memory, with an ETag so that unchanged bodies are not sent again.
+    """
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.compressed_body = gzip.compress(body)
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        # The gzip body is a different representation than the identity body, so it needs its own strong ETag.
+        # See: https://www.rfc-editor.org/rfc/rfc9110#section-8.8.3.3
+        self.compressed_etag = f"{self.etag}-gzip"
+
+    def response(self, cache_control):
+        # Implemented with reference to: https://developer.mozilla.org/en-US/docs/Web/HTTP/Caching#validation
+        request = flask.request
+        is_compressed = "gzip" in request.accept_encodings
+        etag = self.compressed_etag if is_compressed else self.etag
+        if etag in request.if_none_match:
+            response = flask.Response(status=304)
+        elif is_compressed:
+            response = flask.Response(self.compressed_body, mimetype=self.mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = flask.Response(self.body, mimetype=self.mimetype)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = cache_control
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+class MemoizedLayoutDash(Dash):
+    """
+    Dash app which serializes its layout only once per version (e.g the dataset version) instead of on every page load.
+    """
+
+    def __init__(self, *args, layout_version, **kwargs):
+        self.layout_version = layout_version
+        self.serialized_layout = None
+        self.serialized_layout_version = None
+        super().__init__(*args, **kwargs)
+
+    def serialize_layout(self):
+        # Calling this right after setting the layout means that the gunicorn workers inherit the serialized layout (preload_app)
+        version = self.layout_version()
+        if self.serialized_layout == None or self.serialized_layout_version != version:
+            self.serialized_layout = PrecompressedBody(to_json(self._layout_value()).encode("utf-8"), "application/json")
+            self.serialized_layout_version = version
+        return self.serialized_layout
+
+    def serve_layout(self):
+        return self.serialize_layout().response(REVALIDATED_CACHE_CONTROL)
+
+
+class FingerprintedAssets:
+    """
+    Serves static files generated at runtime (e.g a reduced geojson) under a URL which contains the hash of their content.
+    """
+
+    def __init__(self, app, route="_fingerprinted-assets"):
+        self.app = app
+        self.route = route
+        self.assets = {}
+        app.server.add_url_rule(f"{app.config.routes_pathname_prefix}{route}/<path:filename>", endpoint=route, view_func=self.serve)
+
+    def add(self, filename, body, mimetype):
+        """
+        Registers a static file and returns its fingerprinted URL
+            Parameters:
+                filename (str): The name of the file (e.g custom.geo.json)
+                body (bytes): The content of the file
+                mimetype (str): The mimetype of the file
+
+            Returns:
+                url (str): The URL under which the file is served (e.g /_fingerprinted-assets/custom.0123456789ab.geo.json)
+        """
+        fingerprint = hashlib.sha1(body).hexdigest()[:12]
+        name, extension = filename.split(".", 1)
+        fingerprinted_filename = f"{name}.{fingerprint}.{extension}"
+        self.assets[fingerprinted_filename] = PrecompressedBody(body, mimetype)
+        return self.app.get_relative_path(f"/{self.route}/{fingerprinted_filename}")
+
+    def serve(self, filename):
+        if filename not in self.assets:
+            flask.abort(404)
+        return self.assets[filename].response(FINGERPRINTED_CACHE_CONTROL)